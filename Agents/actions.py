@@ -1,6 +1,5 @@
-﻿import copy
-from abc import ABC, abstractmethod
-from random import random
+﻿from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from typing import List, Tuple
 
 from Tools.data import PlayerData, PlayerStatistics, TeamStatistics
@@ -8,25 +7,6 @@ from Tools.enum import T1, T2
 from Tools.game import Game
 
 
-def recursive_update(original, backup):
-    for key, value in backup.__dict__.items():
-        if isinstance(value, (int, float, str, bool, tuple)):
-            setattr(original, key, value)
-        elif isinstance(value, list):
-            setattr(
-                original,
-                key,
-                [
-                    recursive_update(orig, back) if hasattr(orig, "__dict__") else back
-                    for orig, back in zip(getattr(original, key), value)
-                ],
-            )
-        elif hasattr(value, "__dict__"):
-            recursive_update(getattr(original, key), value)
-        else:
-            setattr(original, key, copy.deepcopy(value))
-
-
 class Action(ABC):
     def __init__(
             self,
@@ -42,7 +22,7 @@ class Action(ABC):
         self.player: int = player
         self.team: str = team
         self.game: Game = game
-        self.game_copy = None
+        self.mark: int = 0
 
     def get_player_data(self) -> PlayerData:
         if self.team == T1:
@@ -84,13 +64,11 @@ class Receive(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
-
         receiving_skill = self.get_player_data().p_receive
-        self.success = random() <= receiving_skill
+        self.success = self.game.rng.random() <= receiving_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Serve(Action):
@@ -106,13 +84,12 @@ class Serve(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         serving_skill = self.get_player_data().p_serve
 
-        self.success = random() <= serving_skill
+        self.success = self.game.rng.random() <= serving_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Dig(Action):
@@ -128,12 +105,11 @@ class Dig(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         digging_skill = self.get_player_data().p_dig
-        self.success = random() <= digging_skill
+        self.success = self.game.rng.random() <= digging_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Set(Action):
@@ -149,12 +125,11 @@ class Set(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         setting_skill = self.get_player_data().p_set
-        self.success = random() <= setting_skill
+        self.success = self.game.rng.random() <= setting_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Attack(Action):
@@ -170,12 +145,11 @@ class Attack(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         attacking_skill = self.get_player_data().p_attack
-        self.success = random() <= attacking_skill
+        self.success = self.game.rng.random() <= attacking_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Block(Action):
@@ -191,12 +165,11 @@ class Block(Action):
         self.success: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         blocking_skill = self.get_player_data().p_block
-        self.success = random() <= blocking_skill
+        self.success = self.game.rng.random() <= blocking_skill
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Move(Action):
@@ -213,11 +186,10 @@ class Move(Action):
         self.dest = dest
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
         self.game.field.move_player(self.src, self.dest)
 
     def rollback(self):
-        recursive_update(self.game, self.game_copy)
+        pass
 
 
 class Nothing(Action):
@@ -231,6 +203,55 @@ class Nothing(Action):
         pass
 
 
+CANDIDATE_KINDS = (Receive, Serve, Dig, Set, Attack, Block, Move, Nothing)
+
+
+class CandidateActions(Sequence):
+    """
+    Acciones candidatas de un jugador como listas de tipo (posición en
+    `CANDIDATE_KINDS`), casilla de origen y casilla de destino
+    (`GridField.index`). Cada `Action` se construye la primera vez que se
+    pide, así que puntuarlas no crea ninguna.
+    """
+
+    def __init__(self, player: int, team: str, game: Game) -> None:
+        self.player: int = player
+        self.team: str = team
+        self.game: Game = game
+        self.kinds: List[int] = []
+        self.src: List[int] = []
+        self.dest: List[int] = []
+        self._actions: List[Action | None] = []
+
+    def add(self, kind: type, src: int, dest: int) -> None:
+        self.kinds.append(CANDIDATE_KINDS.index(kind))
+        self.src.append(src)
+        self.dest.append(dest)
+        self._actions.append(None)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, i: int) -> Action:
+        action = self._actions[i]
+        if action is None:
+            action = self._actions[i] = self.build(i)
+        return action
+
+    def build(self, i: int) -> Action:
+        kind = CANDIDATE_KINDS[self.kinds[i]]
+        if kind is Nothing:
+            return Nothing(self.player, self.team, self.game)
+        columns = self.game.field.columns
+        return kind(
+            divmod(self.src[i], columns),
+            divmod(self.dest[i], columns),
+            self.player,
+            self.team,
+            self.game,
+        )
+
+
 class LazyAction(Action, ABC):
     @abstractmethod
     def lazy_execute(self):
@@ -250,6 +271,8 @@ class Substitution(LazyAction):
         if self.player in team_data.unavailable:
             team_data.substitution_history.remove((self.player_out, self.player_in))
             self.not_execute = True
+            # El line-up cambió sin tocar el campo, los contextos cacheados no valen
+            self.game.journal.invalidate()
             return
             # Actualizar las listas de jugadores en cancha y en banca
         team_data.on_field.remove(self.player_out)
@@ -267,7 +290,9 @@ class Substitution(LazyAction):
 
         if self.not_execute:
             self.not_execute = False
+            team_data.line_up.substitute_player(self.player_in, self.player_out)
             team_data.substitution_history.append((self.player_out, self.player_in))
+            self.game.journal.invalidate()
             return
 
         team_data.line_up.substitute_player(self.player_in, self.player_out)
@@ -277,6 +302,8 @@ class Substitution(LazyAction):
         team_data.on_field.add(self.player_out)
         team_data.on_bench.remove(self.player_out)
         team_data.on_bench.add(self.player_in)
+        # Solo se ejecutó si el jugador que sale estaba disponible
+        team_data.unavailable.discard(self.player_out)
 
         # Actualizar el campo de juego
         self.game.field.update_player_on_field(self.player_out, self.player_in)
@@ -288,8 +315,6 @@ class Substitution(LazyAction):
         self.not_execute: bool = False
 
     def execute(self):
-        self.game_copy = copy.deepcopy(self.game)
-
         team_data = self.game.t1 if self.team == T1 else self.game.t2
         team_data.substitution_history.append((self.player_out, self.player_in))
 
@@ -363,11 +388,59 @@ class RestoreLineupAction(Action):
         pass
 
 
+class Checkpoint(Action):
+    def __init__(self, game: Game) -> None:
+        super().__init__((0, 0), (0, 0), -1, "", game)
+
+    def execute(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class Snapshot:
+    def __init__(
+        self, mark: int, stack_len: int, lazy_stack: List[Tuple[Action, bool]]
+    ) -> None:
+        self.mark: int = mark
+        self.stack_len: int = stack_len
+        # Cambios pendientes con su marca `not_execute`; una compresión
+        # posterior vacía la pila, así que no basta con su longitud
+        self.lazy_stack: List[Tuple[Action, bool]] = lazy_stack
+
+
 class Dispatch:
-    def __init__(self, _: Game) -> None:
+    def __init__(self, game: Game) -> None:
         self.stack: List[Action] = []
         self.lazy_stack: List[Action | LazyAction] = []
-        # self.game = game
+        self.game: Game = game
+
+    def checkpoint(self):
+        # Colapsar la historia confirmada en un único punto de control
+        self.stack = [Checkpoint(self.game)]
+        self.game.journal.clear()
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(
+            self.game.journal.mark(),
+            len(self.stack),
+            [
+                (action, isinstance(action, Substitution) and action.not_execute)
+                for action in self.lazy_stack
+            ],
+        )
+
+    def restore(self, snapshot: Snapshot):
+        # Las acciones revierten lo que no pasa por el journal (cambios de
+        # jugadores); el resto lo deshace el journal hasta la marca
+        for _ in range(len(self.stack) - snapshot.stack_len):
+            self.rollback()
+        self.game.journal.undo(snapshot.mark)
+        self.lazy_stack[:] = [action for action, _ in snapshot.lazy_stack]
+        for action, not_execute in snapshot.lazy_stack:
+            if isinstance(action, Substitution):
+                action.not_execute = not_execute
 
     def clear_lazy(self):
         action = CompressAction(self.lazy_stack.copy())
@@ -381,6 +454,7 @@ class Dispatch:
             self.clear_lazy()
 
         self.stack.append(action)
+        action.mark = self.game.journal.mark()
         action.execute()
 
         action_dest = action.dest
@@ -442,8 +516,9 @@ class Dispatch:
 
     @staticmethod
     def serve_trigger(action: Serve):
-        action.game.last_player_touched = action.player
-        action.game.last_team_touched = action.team
+        journal = action.game.journal
+        journal.set(action.game, "last_player_touched", action.player)
+        journal.set(action.game, "last_team_touched", action.team)
         team_stats = action.get_player_statistics()
         player_stats = action.get_player_statistics()
         if not action.success:
@@ -452,29 +527,35 @@ class Dispatch:
                 if action.team == T1
                 else action.game.t2.get_player(action.player)
             )
-            player.errors += 1
-            action.game.rally_over = True
-            player_stats.total_serves += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
+            journal.add(player, "errors")
+            journal.set(action.game, "rally_over", True)
+            if not action.game.headless:
+                journal.add(player_stats, "total_serves")
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
 
 
         else:
-            action.game.has_ball_landed = False
+            journal.set(action.game, "has_ball_landed", False)
             action.game.field.move_ball(action.src, action.dest)
-            action.game.general_touches += 1
-            action.game.touches[action.team] += 1
-            action.game.ball_possession_team = T1 if action.team == T2 else T2
+            journal.add(action.game, "general_touches")
+            journal.set_item(
+                action.game.touches, action.team, action.game.touches[action.team] + 1
+            )
+            journal.set(
+                action.game, "ball_possession_team", T1 if action.team == T2 else T2
+            )
 
-            #
-            player_stats.total_serves += 1
-            player_stats.serves += 1
-            team_stats.serves += 1
+            if not action.game.headless:
+                journal.add(player_stats, "total_serves")
+                journal.add(player_stats, "serves")
+                journal.add(team_stats, "serves")
 
     @staticmethod
     def receive_trigger(action: Receive):
-        action.game.last_player_touched = action.player
-        action.game.last_team_touched = action.team
+        journal = action.game.journal
+        journal.set(action.game, "last_player_touched", action.player)
+        journal.set(action.game, "last_team_touched", action.team)
         team_stats = action.get_statistics()
         player_stats = action.get_player_statistics()
 
@@ -484,31 +565,36 @@ class Dispatch:
                 if action.team == T1
                 else action.game.t2.get_player(action.player)
             )
-            action.game.rally_over = True
+            journal.set(action.game, "rally_over", True)
             # stats
-            player.errors += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
-            player_stats.total_receives += 1
+            journal.add(player, "errors")
+            if not action.game.headless:
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
+                journal.add(player_stats, "total_receives")
 
         else:
             ball_crossed_net = action.game.field.move_ball(action.src, action.dest)
             if ball_crossed_net:
-                action.game.touches[action.team] = 0
+                journal.set_item(action.game.touches, action.team, 0)
             else:
-                action.game.general_touches += 1
-            action.game.has_ball_landed = False
-            action.game.touches[action.team] += 1
+                journal.add(action.game, "general_touches")
+            journal.set(action.game, "has_ball_landed", False)
+            journal.set_item(
+                action.game.touches, action.team, action.game.touches[action.team] + 1
+            )
 
-            # stats 
-            player_stats.total_receives += 1
-            player_stats.receives += 1
-            team_stats.receives += 1
+            # stats
+            if not action.game.headless:
+                journal.add(player_stats, "total_receives")
+                journal.add(player_stats, "receives")
+                journal.add(team_stats, "receives")
 
     @staticmethod
     def set_trigger(action: Set):
-        action.game.last_player_touched = action.player
-        action.game.last_team_touched = action.team
+        journal = action.game.journal
+        journal.set(action.game, "last_player_touched", action.player)
+        journal.set(action.game, "last_team_touched", action.team)
 
         team_stats = action.get_statistics()
         player_stats = action.get_player_statistics()
@@ -519,27 +605,32 @@ class Dispatch:
                 else action.game.t2.get_player(action.player)
             )
             # stats
-            player.errors += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
+            journal.add(player, "errors")
+            if not action.game.headless:
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
 
-            action.game.rally_over = True
+            journal.set(action.game, "rally_over", True)
 
         else:
-            action.game.has_ball_landed = False
+            journal.set(action.game, "has_ball_landed", False)
             action.game.field.move_ball(action.src, action.dest)
-            action.game.general_touches += 1
-            action.game.touches[action.team] += 1
+            journal.add(action.game, "general_touches")
+            journal.set_item(
+                action.game.touches, action.team, action.game.touches[action.team] + 1
+            )
 
             # stats
-            player_stats.total_sets += 1
-            player_stats.sets += 1
-            team_stats.sets += 1
+            if not action.game.headless:
+                journal.add(player_stats, "total_sets")
+                journal.add(player_stats, "sets")
+                journal.add(team_stats, "sets")
 
     @staticmethod
     def attack_trigger(action: Attack):
-        action.game.last_player_touched = action.player
-        action.game.last_team_touched = action.team
+        journal = action.game.journal
+        journal.set(action.game, "last_player_touched", action.player)
+        journal.set(action.game, "last_team_touched", action.team)
         team_stats = action.get_statistics()
         player_stats = action.get_player_statistics()
         if not action.success:
@@ -548,29 +639,33 @@ class Dispatch:
                 if action.team == T1
                 else action.game.t2.get_player(action.player)
             )
-            action.game.rally_over = True
+            journal.set(action.game, "rally_over", True)
 
             # stats
-            player.errors += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
-            player_stats.total_attacks += 1
+            journal.add(player, "errors")
+            if not action.game.headless:
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
+                journal.add(player_stats, "total_attacks")
 
         else:
-            action.game.has_ball_landed = False
+            journal.set(action.game, "has_ball_landed", False)
             action.game.field.move_ball(action.src, action.dest)
-            action.game.general_touches += 1
-            action.game.touches[action.team] += 1
-            action.game.touches[action.team] = 0
-            action.game.ball_possession_team = T1 if action.team == T2 else T2
+            journal.add(action.game, "general_touches")
+            journal.set_item(action.game.touches, action.team, 0)
+            journal.set(
+                action.game, "ball_possession_team", T1 if action.team == T2 else T2
+            )
 
             # stats
-            player_stats.total_attacks += 1
-            player_stats.attacks += 1
-            team_stats.attacks += 1
+            if not action.game.headless:
+                journal.add(player_stats, "total_attacks")
+                journal.add(player_stats, "attacks")
+                journal.add(team_stats, "attacks")
 
     @staticmethod
     def block_trigger(action: Block):
+        journal = action.game.journal
         team_stats = action.get_statistics()
         player_stats = action.get_player_statistics()
         if not action.success:
@@ -579,28 +674,31 @@ class Dispatch:
                 if action.team == T1
                 else action.game.t2.get_player(action.player)
             )
-            player.errors += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
-            player_stats.total_blocks += 1
+            journal.add(player, "errors")
+            if not action.game.headless:
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
+                journal.add(player_stats, "total_blocks")
 
         else:
-            action.game.has_ball_landed = False
-            action.game.last_player_touched = action.player
-            action.game.last_team_touched = action.team
+            journal.set(action.game, "has_ball_landed", False)
+            journal.set(action.game, "last_player_touched", action.player)
+            journal.set(action.game, "last_team_touched", action.team)
             action.game.field.move_ball(action.src, action.dest)
-            action.game.general_touches += 1
+            journal.add(action.game, "general_touches")
 
             # stats
-            player_stats.total_blocks += 1
-            player_stats.blocks += 1
-            team_stats.blocks += 1
+            if not action.game.headless:
+                journal.add(player_stats, "total_blocks")
+                journal.add(player_stats, "blocks")
+                journal.add(team_stats, "blocks")
 
     @staticmethod
     def dig_trigger(action: Dig):
-        action.game.last_player_touched = action.player
-        action.game.last_team_touched = action.team
-        action.game.general_touches += 1
+        journal = action.game.journal
+        journal.set(action.game, "last_player_touched", action.player)
+        journal.set(action.game, "last_team_touched", action.team)
+        journal.add(action.game, "general_touches")
         player_stats = action.get_player_statistics()
         team_stats = action.get_statistics()
         if not action.success:
@@ -609,31 +707,45 @@ class Dispatch:
                 if action.team == T1
                 else action.game.t2.get_player(action.player)
             )
-            action.game.rally_over = True
+            journal.set(action.game, "rally_over", True)
             # stats
-            player.errors += 1
-            player_stats.errors += 1
-            team_stats.errors += 1
-            player_stats.total_digs += 1
+            journal.add(player, "errors")
+            if not action.game.headless:
+                journal.add(player_stats, "errors")
+                journal.add(team_stats, "errors")
+                journal.add(player_stats, "total_digs")
 
 
         else:
-            action.game.has_ball_landed = False
+            journal.set(action.game, "has_ball_landed", False)
             ball_crossed_net = action.game.field.move_ball(action.src, action.dest)
             if ball_crossed_net:
-                action.game.touches[action.team] = 0
-                action.game.ball_possession_team = T1 if action.team == T2 else T2
+                journal.set_item(action.game.touches, action.team, 0)
+                journal.set(
+                    action.game,
+                    "ball_possession_team",
+                    T1 if action.team == T2 else T2,
+                )
             else:
-                action.game.touches[action.team] += 1
+                journal.set_item(
+                    action.game.touches,
+                    action.team,
+                    action.game.touches[action.team] + 1,
+                )
             # stats
-            player_stats.total_digs += 1
-            player_stats.digs += 1
-            team_stats.digs += 1
+            if not action.game.headless:
+                journal.add(player_stats, "total_digs")
+                journal.add(player_stats, "digs")
+                journal.add(team_stats, "digs")
 
     def rollback(self):
         # Deshacer la última acción
+        if self.stack and isinstance(self.stack[-1], Checkpoint):
+            return
         if len(self.lazy_stack) != 0 and self.lazy_stack[-1] == self.stack[-1]:
             self.lazy_stack.pop()
         if self.stack:
             action = self.stack.pop()
             action.rollback()
+            # Deshacer en orden inverso los cambios registrados desde la acción
+            self.game.journal.undo(action.mark)
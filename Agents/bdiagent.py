@@ -4,7 +4,7 @@ from .beliefs import GameState
 from .desires import MaintainDefense, ExecuteOffense, ReturnToPosition, Desire
 from .intentions import DefenseIntention, OffenseIntention, ReturnToPositionIntention
 from .behavior import Defensive, Ofensive, ReturnToPosition, RandomBehavior
-from typing import List, Callable
+from typing import List, Callable, Sequence
 
 
 class BdiAgent:
@@ -22,7 +22,7 @@ class BdiAgent:
             'ReturnToPosition': [ReturnToPosition(1.0)]
         }
 
-    def select_action(self, possible_actions: Callable[[Game], List[Action]], team:str) -> Action:
+    def select_action(self, possible_actions: Callable[[Game], Sequence[Action]], team:str) -> Action:
         self.game_state.update_beliefs()
         applicable_desires = self.determine_desires(team)
         selected_desire = self.select_desire(applicable_desires)
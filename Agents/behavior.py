@@ -1,10 +1,49 @@
-﻿import random
+﻿from typing import List, Sequence
+
+import numpy as np
 
 from Tools.enum import T1, dict_t1, dict_t2
 from Tools.field import GridField
 from Tools.game import Game
 
-from .actions import Action, Block, Dig, Move, Nothing, Receive, Serve, Set
+from .actions import (CANDIDATE_KINDS, Action, Attack, Block, CandidateActions, Dig,
+                      Move, Nothing, Receive, Serve, Set)
+
+ACTION_KINDS = {kind: code for code, kind in enumerate(CANDIDATE_KINDS)}
+
+
+class CandidateBatch:
+    """
+    Acciones candidatas de un jugador en una decisión como arreglos de
+    tipo, casilla de origen y casilla de destino (`GridField.index`).
+    """
+
+    def __init__(self, actions: Sequence[Action], game: Game) -> None:
+        self.actions: Sequence[Action] = actions
+        if isinstance(actions, CandidateActions):
+            # Sin construir las acciones
+            self.player: int = actions.player
+            self.team: str = actions.team
+            self.kinds: np.ndarray = np.array(actions.kinds, dtype=np.int8)
+            self.src: np.ndarray = np.array(actions.src, dtype=np.intp)
+            self.dest: np.ndarray = np.array(actions.dest, dtype=np.intp)
+            return
+        self.player: int = actions[0].player
+        self.team: str = actions[0].team
+        self.kinds: np.ndarray = np.fromiter(
+            (ACTION_KINDS.get(type(action), -1) for action in actions), dtype=np.int8
+        )
+        self.src: np.ndarray = game.field.indices([action.src for action in actions])
+        self.dest: np.ndarray = game.field.indices([action.dest for action in actions])
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def of(self, *kinds: type) -> np.ndarray:
+        mask = self.kinds == ACTION_KINDS[kinds[0]]
+        for kind in kinds[1:]:
+            mask |= self.kinds == ACTION_KINDS[kind]
+        return mask
 
 
 class Behavior:
@@ -14,13 +53,40 @@ class Behavior:
     def eval(self, action: Action, game: Game) -> float:
         pass
 
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        return np.array([self.eval(action, game) for action in batch.actions], dtype=float)
+
     def change_importance(self, importance: float) -> None:
         self.importance = importance
 
 
+def score_actions(
+    behaviors: List[Behavior], actions: Sequence[Action], game: Game
+) -> np.ndarray:
+    if not actions:
+        return np.zeros(0)
+    batch = CandidateBatch(actions, game)
+    scores = np.zeros(len(batch))
+    for behavior in behaviors:
+        scores += behavior.eval_batch(batch, game)
+    return scores
+
+
+def best_action(behaviors: List[Behavior], actions: Sequence[Action], game: Game) -> Action:
+    return actions[int(np.argmax(score_actions(behaviors, actions, game)))]
+
+
+def random_scores(batch: CandidateBatch, game: Game, importance: float) -> np.ndarray:
+    # Un número por acción en el mismo orden que eval
+    return game.rng.randoms(len(batch)) * importance
+
+
 class Random(Behavior):
     def eval(self, action: Action, game: Game) -> float:
-        return random.random() * self.importance
+        return game.rng.random() * self.importance
+
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        return random_scores(batch, game, self.importance)
 
 
 class ReturnToPosition(Behavior):
@@ -41,6 +107,10 @@ class ReturnToPosition(Behavior):
         else:
             return 0
 
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        # `action is Move` compara con la clase, así que eval siempre devuelve 0
+        return np.zeros(len(batch))
+
 
 class Defensive(Behavior):
     def eval(self, action: Action, game: Game) -> float:
@@ -56,7 +126,7 @@ class Defensive(Behavior):
             if isinstance(action, Block):
                 neighbor_opponents = 0
                 x, y = destination
-                dest_grid: GridField = GridField(x, y, -1, False, "")
+                dest_grid: GridField = game.field.grid[x][y]
                 for grid in game.field.neighbor_grids(dest_grid, 2):
                     if grid.team == opponent_team:
                         neighbor_opponents += 1
@@ -126,6 +196,41 @@ class Defensive(Behavior):
 
         return value + self.importance
 
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        values = np.zeros(len(batch))
+        # Fuera de nuestro lado `player.position` es el número de rotación y
+        # nunca coincide con un rol, así que eval solo suma la importancia
+        context = game.context()
+        if context.ball.team != batch.team:
+            return values + self.importance
+
+        distances = game.field.euclidean_array[batch.dest]
+
+        block = batch.of(Block)
+        if block.any():
+            counts = context.opponents_near(batch.team)[batch.dest[block]]
+            values[block] = 1 / (counts + 1)
+
+        receive = batch.of(Receive, Dig)
+        if receive.any():
+            setter_position = context.role_position("S", batch.team)
+            values[receive] = 1 / (distances[receive, setter_position.index] + 1)
+
+        set_ = batch.of(Set)
+        if set_.any():
+            opposite_position = context.role_position("O", batch.team)
+            # Con menos de dos OH role_position devuelve el primero, o None
+            hitters = context.role_grids("OH", batch.team)[:2] or [
+                context.role_position("OH", batch.team)
+            ]
+            distance_to_attack = np.minimum.reduce(
+                [distances[set_, grid.index] for grid in [opposite_position] + hitters]
+            )
+            closest_enemy_distance = context.nearest_enemy(batch.team)[batch.dest[set_]]
+            values[set_] = 1 / ((distance_to_attack + closest_enemy_distance) + 1)
+
+        return values + self.importance
+
 
 class Ofensive(Behavior):
     def eval(self, action: Action, game: Game) -> float:
@@ -138,7 +243,7 @@ class Ofensive(Behavior):
         elif not isinstance(action, Nothing):
             neighbor_opponents = 0
             x, y = destination
-            dest_grid: GridField = GridField(x, y, -1, False, "")
+            dest_grid: GridField = game.field.grid[x][y]
             for grid in game.field.neighbor_grids(dest_grid, 2):
                 if grid.team == opponent_team:
                     neighbor_opponents += 1
@@ -146,10 +251,53 @@ class Ofensive(Behavior):
 
         return value + self.importance
 
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        values = np.zeros(len(batch))
+        near = ~batch.of(Serve, Nothing)
+        if near.any():
+            counts = game.context().opponents_near(batch.team)[batch.dest[near]]
+            values[near] = 1 / (counts + 1)
+        return np.where(batch.of(Serve), 1 * self.importance, values + self.importance)
+
+
+class OpenSpace(Behavior):
+    def eval(self, action: Action, game: Game) -> float:
+        # Saques y ataques hacia donde el rival más cercano está más lejos
+        if not isinstance(action, Serve) and not isinstance(action, Attack):
+            return 0
+
+        opponent_team = game.get_opponent_team(action.team)
+        distance = min(
+            game.field.distance(action.dest, (grid.row, grid.col))
+            for grid in (
+                game.field.find_player(player, opponent_team)
+                for player in game.get_players(opponent_team)
+            )
+        )
+        return (1 - 1 / (distance + 1)) * self.importance
+
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        values = np.zeros(len(batch))
+        aimed = batch.of(Serve, Attack)
+        if aimed.any():
+            opponent_team = game.get_opponent_team(batch.team)
+            opponents = [
+                game.field.find_player(player, opponent_team).index
+                for player in game.get_players(opponent_team)
+            ]
+            distance = game.field.euclidean_array[
+                np.ix_(batch.dest[aimed], opponents)
+            ].min(axis=1)
+            values[aimed] = (1 - 1 / (distance + 1)) * self.importance
+        return values
+
 
 class RandomBehavior(Behavior):
     def eval(self, action: Action, game: Game) -> float:
-        return random.random() * self.importance
+        return game.rng.random() * self.importance
+
+    def eval_batch(self, batch: CandidateBatch, game: Game) -> np.ndarray:
+        return random_scores(batch, game, self.importance)
 
 
 def is_front_row(row: int, team: str) -> bool:
@@ -1,7 +1,133 @@
-﻿import numpy as np
+﻿from bisect import bisect_right
+from typing import Dict, List, Tuple
+
+import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 
+from Tools.enum import get_role_number
+from Tools.field import COLUMNS, ROWS, distance_tables
+
+TABLE_STEP = 0.1  # Paso de la rejilla de distancias de las tablas
+
+
+class FuzzyTable:
+    """
+    Sistema Mamdani de dos distancias y un rol compilado en una tabla: la
+    salida de `compute()` en cada nodo de una rejilla por rol, con
+    interpolación bilineal entre nodos. Las distancias entre casillas del
+    campo son nodos de la rejilla, así que para ellas el valor es el mismo
+    que da skfuzzy.
+    """
+
+    def __init__(
+        self,
+        position: ctrl.Antecedent,
+        ball: ctrl.Antecedent,
+        role: ctrl.Antecedent,
+        output: ctrl.Consequent,
+        rules: List[ctrl.Rule],
+    ) -> None:
+        self.position_nodes: np.ndarray = grid_nodes(position)
+        self.ball_nodes: np.ndarray = grid_nodes(ball)
+        self.roles: np.ndarray = role.universe
+        inputs = {
+            position.label: self.position_nodes[:, None, None],
+            ball.label: self.ball_nodes[None, :, None],
+            role.label: self.roles[None, None, :],
+        }
+        shape = (len(self.position_nodes), len(self.ball_nodes), len(self.roles))
+
+        # Mismos pasos que ControlSystemSimulation: AND con fmin, acumulación con fmax
+        cuts: Dict[str, np.ndarray] = {}
+        for rule in rules:
+            firing = None
+            for term in rule.antecedent_terms:
+                value = fuzz.interp_membership(
+                    term.parent.universe, term.mf, inputs[term.parent.label]
+                )
+                firing = value if firing is None else np.fmin(firing, value)
+            for consequent in rule.consequent:
+                activation = firing * consequent.weight
+                label = consequent.term.label
+                cuts[label] = (
+                    activation if label not in cuts else np.fmax(activation, cuts[label])
+                )
+
+        # Muchos nodos comparten los mismos cortes: se defuzzifica cada combinación una vez
+        labels = list(cuts)
+        stacked = np.stack(
+            [np.broadcast_to(cuts[label], shape) for label in labels], axis=-1
+        ).reshape(-1, len(labels))
+        unique, inverse = np.unique(stacked, axis=0, return_inverse=True)
+        values = np.array([defuzz_cuts(output, dict(zip(labels, row))) for row in unique])
+        self.values: np.ndarray = values[inverse.reshape(-1)].reshape(shape)
+        self.position_list: List[float] = self.position_nodes.tolist()
+        self.ball_list: List[float] = self.ball_nodes.tolist()
+
+    def evaluate(self, distance_to_position: float, distance_to_ball: float, role: int) -> float:
+        i, wi = locate_one(self.position_list, distance_to_position)
+        j, wj = locate_one(self.ball_list, distance_to_ball)
+        r = int(min(max(role, self.roles[0]), self.roles[-1]) - self.roles[0])
+        v = self.values
+        return float(
+            (1 - wi) * (1 - wj) * v[i, j, r]
+            + wi * (1 - wj) * v[i + 1, j, r]
+            + (1 - wi) * wj * v[i, j + 1, r]
+            + wi * wj * v[i + 1, j + 1, r]
+        )
+
+    def evaluate_many(
+        self, distance_to_position: np.ndarray, distance_to_ball: np.ndarray, roles: np.ndarray
+    ) -> np.ndarray:
+        i, wi = locate(self.position_nodes, distance_to_position)
+        j, wj = locate(self.ball_nodes, distance_to_ball)
+        # Como en skfuzzy, un rol fuera del universo se recorta al extremo
+        r = np.clip(roles, self.roles[0], self.roles[-1]).astype(int) - self.roles[0]
+        v = self.values
+        return (
+            (1 - wi) * (1 - wj) * v[i, j, r]
+            + wi * (1 - wj) * v[i + 1, j, r]
+            + (1 - wi) * wj * v[i, j + 1, r]
+            + wi * wj * v[i + 1, j + 1, r]
+        )
+
+
+def grid_nodes(variable: ctrl.Antecedent) -> np.ndarray:
+    low, high = variable.universe.min(), variable.universe.max()
+    cells = np.array(distance_tables(ROWS, COLUMNS).euclidean).ravel()
+    nodes = np.union1d(np.arange(low, high + TABLE_STEP / 2, TABLE_STEP), cells)
+    return nodes[(low <= nodes) & (nodes <= high)]
+
+
+def locate(nodes: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Nodo a la izquierda de cada valor y peso del nodo siguiente
+    x = np.clip(x, nodes[0], nodes[-1])
+    i = np.clip(np.searchsorted(nodes, x, side="right") - 1, 0, len(nodes) - 2)
+    return i, (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+
+
+def locate_one(nodes: List[float], x: float) -> Tuple[int, float]:
+    x = min(max(x, nodes[0]), nodes[-1])
+    i = min(max(bisect_right(nodes, x) - 1, 0), len(nodes) - 2)
+    return i, (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+
+
+def defuzz_cuts(output: ctrl.Consequent, cuts: Dict[str, float]) -> float:
+    # Réplica de CrispValueCalculator.find_memberships seguida de defuzz
+    points = []
+    for label, cut in cuts.items():
+        points.extend(fuzz.interp_universe(output.universe, output[label].mf, cut))
+    universe = np.union1d(output.universe, points)
+    membership = np.zeros_like(universe, dtype=np.float64)
+    for label, cut in cuts.items():
+        term = np.minimum(cut, fuzz.interp_membership(output.universe, output[label].mf, universe))
+        np.maximum(membership, term, out=membership)
+    return fuzz.defuzz(universe, membership, output.defuzzify_method)
+
+
+_tables: Dict[str, FuzzyTable] = {}
+
 
 class DefensivePositionFuzzySystem:
     def __init__(self):
@@ -78,10 +204,25 @@ class DefensivePositionFuzzySystem:
             ctrl.Rule(self.distance_to_position['high'] & self.distance_to_ball['high'] & self.player_role['O'], self.defensive_position['bad']),
         ]
 
-        self.defensive_position_ctrl = ctrl.ControlSystem(self.rules)
-        self.simulation = ctrl.ControlSystemSimulation(self.defensive_position_ctrl)
+        # La inferencia de skfuzzy solo se monta para validar la tabla
+        self.defensive_position_ctrl = None
+        self.simulation = None
+        if 'defensive' not in _tables:
+            _tables['defensive'] = FuzzyTable(self.distance_to_position, self.distance_to_ball,
+                                              self.player_role, self.defensive_position, self.rules)
+        self.table = _tables['defensive']
 
     def evaluate(self, distance_to_position, distance_to_ball, player_role):
+        return self.table.evaluate(distance_to_position, distance_to_ball, get_role_number(player_role))
+
+    def evaluate_many(self, distance_to_position, distance_to_ball, role_numbers):
+        return self.table.evaluate_many(distance_to_position, distance_to_ball, role_numbers)
+
+    def reference(self, distance_to_position, distance_to_ball, player_role):
+        if self.simulation is None:
+            self.defensive_position_ctrl = ctrl.ControlSystem(self.rules)
+            self.simulation = ctrl.ControlSystemSimulation(self.defensive_position_ctrl)
+
         self.simulation.input['distance_to_position'] = distance_to_position
         self.simulation.input['distance_to_ball'] = distance_to_ball
         self.simulation.input['player_role'] = get_role_number(player_role)
@@ -171,29 +312,30 @@ class OffensivePositionFuzzySystem:
             ctrl.Rule(self.distance_to_position['high'] & self.distance_to_ball['high'] & self.player_role['O'], self.offensive_position['bad']),
         ]
 
-        self.offensive_position_ctrl = ctrl.ControlSystem(self.rules)
-        self.simulation = ctrl.ControlSystemSimulation(self.offensive_position_ctrl)
+        # La inferencia de skfuzzy solo se monta para validar la tabla
+        self.offensive_position_ctrl = None
+        self.simulation = None
+        if 'offensive' not in _tables:
+            _tables['offensive'] = FuzzyTable(self.distance_to_position, self.distance_to_ball,
+                                              self.player_role, self.offensive_position, self.rules)
+        self.table = _tables['offensive']
 
     def evaluate(self, distance_to_position, distance_to_net, distance_to_ball, player_role):
+        # Ninguna regla usa distance_to_net
+        return self.table.evaluate(distance_to_position, distance_to_ball, get_role_number(player_role))
+
+    def evaluate_many(self, distance_to_position, distance_to_ball, role_numbers):
+        return self.table.evaluate_many(distance_to_position, distance_to_ball, role_numbers)
+
+    def reference(self, distance_to_position, distance_to_net, distance_to_ball, player_role):
+        if self.simulation is None:
+            self.offensive_position_ctrl = ctrl.ControlSystem(self.rules)
+            self.simulation = ctrl.ControlSystemSimulation(self.offensive_position_ctrl)
+
         self.simulation.input['distance_to_position'] = distance_to_position
-        self.simulation.input['distance_to_net'] = distance_to_net
         self.simulation.input['distance_to_ball'] = distance_to_ball
         self.simulation.input['player_role'] = get_role_number(player_role)
 
         self.simulation.compute()
 
         return self.simulation.output['offensive_position']
-
-
-def get_role_number(role):
-    if role == 'L':
-        return 0
-    if role == 'S':
-        return 1
-    if role == 'MB':
-        return 2
-    if role == 'OH':
-        return 3
-    if role == 'O':
-        return 4
-    return -1
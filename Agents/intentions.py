@@ -2,7 +2,7 @@
 from typing import List
 
 from .actions import Action
-from .behavior import Behavior
+from .behavior import Behavior, best_action
 
 
 class Intention(ABC):
@@ -13,23 +13,14 @@ class Intention(ABC):
 
 class DefenseIntention(Intention):
     def select_action(self, behaviors, game_state, possible_actions) -> Action:
-        return max(
-            possible_actions,
-            key=lambda a: sum([b.eval(a, game_state.game) for b in behaviors])
-        )
+        return best_action(behaviors, possible_actions, game_state.game)
 
 
 class OffenseIntention(Intention):
     def select_action(self, behaviors, game_state, possible_actions) -> Action:
-        return max(
-            possible_actions,
-            key=lambda a: sum([b.eval(a, game_state.game) for b in behaviors])
-        )
+        return best_action(behaviors, possible_actions, game_state.game)
 
 
 class ReturnToPositionIntention(Intention):
     def select_action(self, behaviors, game_state, possible_actions) -> Action:
-        return max(
-            possible_actions,
-            key=lambda a: sum([b.eval(a, game_state.game) for b in behaviors])
-        )
+        return best_action(behaviors, possible_actions, game_state.game)
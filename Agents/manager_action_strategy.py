@@ -1,9 +1,9 @@
 ﻿from abc import ABC, abstractmethod
-from random import choice
 from typing import List
 
 from Tools.enum import T1
 from Tools.game import Game
+from Tools.timing import Deadline
 from .actions import (Action, ManagerCelebrate, ManagerNothing, Substitution,
                       Timeout)
 from .simulator_agent import SimulatorAgent
@@ -64,19 +64,25 @@ def possible_actions(game: Game, team: str) -> List[Action]:
 
 class ManagerActionStrategy(ABC):
     @abstractmethod
-    def action(self, team: str, simulator: SimulatorAgent) -> Action:
+    def action(
+            self, team: str, simulator: SimulatorAgent, deadline: Deadline | None = None
+    ) -> Action | None:
         pass
 
 
 class ActionRandomStrategy(ManagerActionStrategy):
-    def action(self, team: str, simulator: SimulatorAgent) -> Action:
+    def action(
+            self, team: str, simulator: SimulatorAgent, deadline: Deadline | None = None
+    ) -> Action | None:
         actions = possible_actions(simulator.game, team)
-        return choice(actions) if actions else ManagerNothing(team, simulator.game)
+        return simulator.game.rng.choice(actions) if actions else ManagerNothing(team, simulator.game)
 
 
 class ActionSimulateStrategy(ManagerActionStrategy):
 
-    def action(self, team: str, simulator: SimulatorAgent) -> Action:
+    def action(
+            self, team: str, simulator: SimulatorAgent, deadline: Deadline | None = None
+    ) -> Action | None:
 
         game = simulator.game
         team_score = game.t1_score if team == T1 else game.t2_score
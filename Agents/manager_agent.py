@@ -1,4 +1,5 @@
 ﻿from Tools.line_up import LineUp
+from Tools.timing import Deadline
 
 from .actions import Action
 from .manager_action_strategy import (ActionRandomStrategy,
@@ -21,8 +22,11 @@ class Manager:
     def get_line_up(self, simulator: SimulatorAgent) -> LineUp:
         return self.line_up_strategy.get_line_up(self.team, simulator)
 
-    def action(self, simulator: SimulatorAgent) -> Action:
-        return self.action_strategy.action(self.team, simulator)
+    def action(self, simulator: SimulatorAgent, deadline: Deadline | None = None) -> Action:
+        action = self.action_strategy.action(self.team, simulator, deadline)
+        if action is None:
+            return self.heuristic_action(simulator)
+        return action
 
     def heuristic_action(self, simulator: SimulatorAgent) -> Action:
         return ActionRandomStrategy().action(self.team, simulator)
@@ -2,9 +2,10 @@
 
 from Agents.simulator_agent import SimulatorAgent
 from Tools.field import *
+from Tools.timing import Deadline
 
 from .actions import *
-from .player_strategy import PlayerStrategy, VolleyballStrategy
+from .player_strategy import PlayerStrategy, RandomStrategy, VolleyballStrategy
 
 
 class Player:
@@ -14,13 +15,18 @@ class Player:
         self.dorsal = dorsal
         self.team = team
 
-    def possible_actions(self, game: Game) -> List[Action]:
+    def possible_actions(self, game: Game) -> CandidateActions:
         visible_grids, p_grid = self.get_perceptions(game)
         actions = self.construct_actions(game, visible_grids, p_grid)
         return actions
 
-    def play(self, simulator: SimulatorAgent):
-        action = self.strategy.select_action(self.possible_actions, simulator)
+    def play(self, simulator: SimulatorAgent, deadline: Deadline | None = None):
+        action = self.strategy.select_action(self.possible_actions, simulator, deadline)
+        if action is None:
+            # La estrategia no llegó a decidir: la heurística si queda tiempo, si no al azar
+            if deadline is not None and deadline.expired():
+                return RandomStrategy().select_action(self.possible_actions, simulator)
+            return self.play_heuristic(simulator)
         return action
 
     def play_heuristic(self, simulator: SimulatorAgent):
@@ -42,14 +48,12 @@ class Player:
 
     @staticmethod
     def empty_adjacent_grids(
-        visible_grids: List[GridField], p_grid: GridField
+        field: Field, p_grid: GridField
     ) -> Generator[GridField, None, None]:
-        for g in visible_grids:
-            if (
-                1 < Field.distance((g.row, g.col), (p_grid.row, p_grid.col)) <= 2
-                and g.is_empty()
-                and g.team == p_grid.team
-            ):
+        distances = field.euclidean[p_grid.index]
+        for index in field.neighbors[2][p_grid.index]:
+            g = field.cells[index]
+            if 1 < distances[index] and g.is_empty() and g.team == p_grid.team:
                 yield g
 
     def friendly_grids(
@@ -68,96 +72,48 @@ class Player:
 
     def construct_actions(
         self, game: Game, visible_grids: List[GridField], p_grid: GridField
-    ) -> List[Action]:
-        actions: List[Action] = [Nothing(self.dorsal, self.team, game)]
+    ) -> CandidateActions:
+        actions = CandidateActions(self.dorsal, self.team, game)
+        serving = game.is_our_serve(self.team) and game.general_touches == 0
+
+        # El sacador no puede quedarse sin hacer nada
+        if not (serving and game.is_player_server(self.dorsal)):
+            actions.add(Nothing, 0, 0)
 
-        ball_src = game.field.find_ball()
-        ball_src = (ball_src.row, ball_src.col)
+        ball_src = game.field.find_ball().index
 
         if game.last_player_touched == self.dorsal and game.general_touches != 0:
             return actions
 
-        if game.is_our_serve(self.team) and game.general_touches == 0:
+        if serving:
             if game.is_player_server(self.dorsal):
-                actions.pop()
                 for grid in self.enemy_grids(visible_grids):
-                    dest = (grid.row, grid.col)
-                    actions.append(Serve(ball_src, dest, self.dorsal, self.team, game))
+                    actions.add(Serve, ball_src, grid.index)
             else:
-                for grid in self.empty_adjacent_grids(visible_grids, p_grid):
-                    dest = (grid.row, grid.col)
-                    actions.append(
-                        Move(
-                            (p_grid.row, p_grid.col), dest, self.dorsal, self.team, game
-                        )
-                    )
+                for grid in self.empty_adjacent_grids(game.field, p_grid):
+                    actions.add(Move, p_grid.index, grid.index)
 
         # La pelota está en nuestro lado
         elif game.is_ball_on_our_side(self.team):
             if game.is_ball_coming_to_player(self.dorsal, self.team):
                 if game.last_team_touched != self.team:
                     for grid in self.friendly_grids(visible_grids):
-                        actions.append(
-                            Dig(
-                                ball_src,
-                                (grid.row, grid.col),
-                                self.dorsal,
-                                self.team,
-                                game,
-                            )
-                        )
+                        actions.add(Dig, ball_src, grid.index)
                     if 5 < game.field.find_player(self.dorsal, self.team).row < 13:
                         for grid in self.enemy_grids(visible_grids):
-                            actions.append(
-                                Block(
-                                    ball_src,
-                                    (grid.row, grid.col),
-                                    self.dorsal,
-                                    self.team,
-                                    game,
-                                )
-                            )
+                            actions.add(Block, ball_src, grid.index)
                 elif game.touches[self.team] == 1:
                     for grid in self.friendly_grids(visible_grids):
-                        actions.append(
-                            Set(
-                                ball_src,
-                                (grid.row, grid.col),
-                                self.dorsal,
-                                self.team,
-                                game,
-                            )
-                        )
+                        actions.add(Set, ball_src, grid.index)
                     for grid in self.enemy_grids(visible_grids):
-                        actions.append(
-                            Attack(
-                                ball_src,
-                                (grid.row, grid.col),
-                                self.dorsal,
-                                self.team,
-                                game,
-                            )
-                        )
+                        actions.add(Attack, ball_src, grid.index)
 
                 elif game.touches[self.team] == 2:
                     for grid in self.enemy_grids(visible_grids):
-                        actions.append(
-                            Attack(
-                                ball_src,
-                                (grid.row, grid.col),
-                                self.dorsal,
-                                self.team,
-                                game,
-                            )
-                        )
+                        actions.add(Attack, ball_src, grid.index)
 
             else:
-                for grid in self.empty_adjacent_grids(visible_grids, p_grid):
-                    dest = (grid.row, grid.col)
-                    actions.append(
-                        Move(
-                            (p_grid.row, p_grid.col), dest, self.dorsal, self.team, game
-                        )
-                    )
+                for grid in self.empty_adjacent_grids(game.field, p_grid):
+                    actions.add(Move, p_grid.index, grid.index)
 
         return actions
@@ -1,21 +1,37 @@
-﻿from random import choice
-from typing import Callable
+﻿import math
+from time import perf_counter
+from typing import Callable, Dict, Sequence
 
-from Tools.enum import dict_t1
+import numpy as np
+
+from Tools.enum import dict_t1, dict_t2, get_role_number
+from Tools.timing import Deadline
 from .actions import *
 from .bdiagent import BdiAgent
-from .behavior import Behavior, RandomBehavior, Defensive, ReturnToPosition, Ofensive
-from .fuzzy_rules import DefensivePositionFuzzySystem, OffensivePositionFuzzySystem
+from .behavior import Behavior, RandomBehavior, Defensive, ReturnToPosition, Ofensive, OpenSpace, best_action, score_actions
 from .simulator_agent import SimulatorAgent
+from .transposition_table import EXACT, LOWER, UPPER, TranspositionTable, action_key
 
 
 class PlayerStrategy(ABC):
     @abstractmethod
     def select_action(
             self,
-            possible_actions: Callable[[Game], List[Action]],
+            possible_actions: Callable[[Game], Sequence[Action]],
             simulator: SimulatorAgent,
-    ) -> Action:
+            deadline: Deadline | None = None,
+    ) -> Action | None:
+        """
+        Al vencer `deadline` devuelve la mejor acción encontrada hasta el
+        momento, o None si todavía no tiene ninguna.
+        """
+        pass
+
+    def warm_up(self) -> None:
+        """
+        Carga lo que la estrategia necesita para decidir antes de empezar el
+        partido, para que no cuente en el tiempo de la primera decisión.
+        """
         pass
 
 
@@ -25,12 +41,9 @@ class BehaviorStrategy(ABC):
         self.behaviors: List[Behavior] = []
 
     def select_action_behavior(
-            self, actions: List[Action], simulator: SimulatorAgent
+            self, actions: Sequence[Action], simulator: SimulatorAgent
     ) -> Action:
-        return max(
-            actions,
-            key=lambda a: sum([b.eval(a, simulator.game) for b in self.behaviors]),
-        )
+        return best_action(self.behaviors, actions, simulator.game)
 
 
 class VolleyballStrategy(PlayerStrategy):
@@ -39,9 +52,10 @@ class VolleyballStrategy(PlayerStrategy):
 
     def select_action(
             self,
-            possible_actions: Callable[[Game], List[Action]],
+            possible_actions: Callable[[Game], Sequence[Action]],
             simulator: SimulatorAgent,
-    ) -> Action:
+            deadline: Deadline | None = None,
+    ) -> Action | None:
         team = possible_actions(simulator.game)[0].team
         agent = BdiAgent(simulator.game)
         return agent.select_action(possible_actions, team)
@@ -72,57 +86,141 @@ class RandomStrategy(BehaviorStrategy, PlayerStrategy):
 
     def select_action(
             self,
-            possible_actions: Callable[[Game], List[Action]],
+            possible_actions: Callable[[Game], Sequence[Action]],
             simulator: SimulatorAgent,
-    ) -> Action:
-        return choice(possible_actions(simulator.game))
+            deadline: Deadline | None = None,
+    ) -> Action | None:
+        return simulator.game.rng.choice(possible_actions(simulator.game))
 
 
 MIN = -10000000000
+MAX = 10000000000
 CANT_SIMULATIONS = 1
+# Peso de la probabilidad de ganar el partido en la evaluación
+WIN_PROBABILITY_WEIGHT = 10000
 
 
 class MinimaxStrategy(PlayerStrategy):
     def __init__(self):
         super().__init__()
         self.evaluator = GameEvaluator()
+        # Compartida por todos los jugadores del equipo que usan esta estrategia
+        self.table = TranspositionTable()
+        self.game: Game | None = None
+
+    def warm_up(self) -> None:
+        self.evaluator.warm_up()
 
     def select_action(
             self,
-            possible_actions: Callable[[Game], List[Action]],
+            possible_actions: Callable[[Game], Sequence[Action]],
             simulator: SimulatorAgent,
-    ) -> Action:
+            deadline: Deadline | None = None,
+    ) -> Action | None:
+        if simulator.game is not self.game:
+            self.table.clear()
+            self.game = simulator.game
+
         actions = possible_actions(simulator.game)
 
         # print(f'{"T1" if team == T1 else "T2"}-{player} player is thinking')
 
         depth = 1
 
-        action = self.best_function(actions, possible_actions, simulator, depth, True)[
-            1
-        ]
+        action = self.best_function(
+            actions, possible_actions, simulator, depth, True, deadline
+        )[1]
 
         return action
 
     def best_function(
             self,
-            actions: List[Action],
-            possible_actions: Callable[[Game], List[Action]],
+            actions: Sequence[Action],
+            possible_actions: Callable[[Game], Sequence[Action]],
             simulator: SimulatorAgent,
             depth: int,
             first: bool = False,
+            deadline: Deadline | None = None,
     ) -> Tuple[float, Action | None]:
         if depth == 0 or simulator.game.is_finish():
             return self.evaluation(simulator.game, actions[0].team)
 
+        key = (simulator.game.hash(), actions[0].team, actions[0].player)
+        entry = self.table.probe(key, depth)
+        if entry is not None:
+            action = self.table.find_action(actions, entry.best_action)
+            if action is not None:
+                return entry.value, action
+
+        parallel = first and depth == 1 and len(actions) > 1
+        if parallel and simulator.can_parallelize():
+            # Las candidatas de la raíz son independientes: se reparten entre
+            # procesos las que no están ya en la tabla, como en serie. Con
+            # plazo, las que no llegaron a simular no cuentan y los valores
+            # incompletos no se guardan
+            children = []
+            for action in actions:
+                snapshot = simulator.dispatch().snapshot()
+                simulator.dispatch().dispatch(action)
+                child_key = (simulator.game.hash(), action.team)
+                simulator.dispatch().restore(snapshot)
+                children.append((action, child_key, self.table.probe(child_key, depth)))
+
+            pending = [action for action, _, child in children if child is None]
+            values = iter(
+                simulator.parallel_rollouts(pending, CANT_SIMULATIONS, deadline)
+                if pending else []
+            )
+
+            best, best_action = MIN, None
+            exact = True
+            for action, child_key, child in children:
+                if child is not None:
+                    value = child.value
+                else:
+                    samples = next(values)
+                    if len(samples) < CANT_SIMULATIONS:
+                        exact = False
+                    if not samples:
+                        continue
+                    value = max(samples)
+                    if len(samples) == CANT_SIMULATIONS:
+                        self.table.store(child_key, value, depth)
+                if value > best:
+                    best, best_action = value, action
+            if exact:
+                self.table.store(key, best, depth, best_action)
+            return best, best_action
+
         best, best_action = MIN, None
+        exact = True
 
         for action in actions:
-            len_stack = len(simulator.dispatch().stack)
+            if deadline is not None and deadline.expired():
+                exact = False
+                break
+
+            snapshot = simulator.dispatch().snapshot()
 
             simulator.dispatch().dispatch(action)
 
+            # Acciones distintas (de este u otro jugador) llegan al mismo estado
+            child_key = (simulator.game.hash(), action.team)
+            child = self.table.probe(child_key, depth)
+            if child is not None:
+                if child.value > best:
+                    best = child.value
+                    best_action = action
+                simulator.dispatch().restore(snapshot)
+                continue
+
+            value = MIN
             for _ in range(CANT_SIMULATIONS):
+                # El plazo se comprueba también entre simulaciones
+                if deadline is not None and deadline.expired():
+                    exact = False
+                    break
+
                 if first:
                     simulator.simulate_current()
                 else:
@@ -133,8 +231,10 @@ class MinimaxStrategy(PlayerStrategy):
                     possible_actions,
                     simulator,
                     depth - 1,
+                    deadline=deadline,
                 )
 
+                value = max(value, r)
                 if r > best:
                     best = r
                     best_action = action
@@ -145,19 +245,348 @@ class MinimaxStrategy(PlayerStrategy):
                 else:
                     simulator.reset()
 
-            while len(simulator.dispatch().stack) != len_stack:
-                simulator.dispatch().rollback()
+            simulator.dispatch().restore(snapshot)
+            if not exact:
+                # Con las simulaciones incompletas el valor no se guarda
+                break
+            self.table.store(child_key, value, depth)
 
+        if exact:
+            self.table.store(key, best, depth, best_action)
         return best, best_action
 
     def evaluation(self, game: Game, team: str) -> Tuple[float, Action | None]:
-        return self.evaluator.eval(game, team), None
+        key = (game.hash(), team, None)
+        entry = self.table.probe(key, 0)
+        if entry is not None:
+            return entry.value, None
+
+        value = self.evaluator.eval(game, team)
+        self.table.store(key, value, 0)
+        return value, None
+
+
+class AlphaBetaStrategy(MinimaxStrategy):
+    """
+    Variante de minimax con poda alfa-beta. Cada acción propia es un nodo
+    max y las jugadas simuladas que siguen son un nodo min sobre `rollouts`
+    muestras. Las acciones se ordenan con los comportamientos ofensivos y en
+    cada nodo se examinan las `width` primeras. La profundidad crece de uno
+    en uno mientras quede presupuesto, medido en jugadas simuladas y relativo
+    a lo que cuesta hoy la búsqueda a profundidad 1.
+    """
+
+    def __init__(
+            self,
+            max_depth: int = 3,
+            rollouts: int = 2,
+            width: int = 4,
+            budget: float = 1.0,
+    ):
+        super().__init__()
+        self.max_depth: int = max_depth
+        self.rollouts: int = rollouts
+        self.width: int = width
+        self.budget: float = budget
+        self.ordering: List[Behavior] = [Ofensive(importance=1.8), OpenSpace()]
+        self.spent: int = 0
+        self.limit: int = 0
+
+    def select_action(
+            self,
+            possible_actions: Callable[[Game], Sequence[Action]],
+            simulator: SimulatorAgent,
+            deadline: Deadline | None = None,
+    ) -> Action | None:
+        if simulator.game is not self.game:
+            self.table.clear()
+            self.game = simulator.game
+
+        actions = possible_actions(simulator.game)
+        if len(actions) == 1:
+            return actions[0]
+
+        self.spent = 0
+        self.limit = int(len(actions) * CANT_SIMULATIONS * self.budget)
+
+        # Solo las mejores candidatas según el orden se buscan en profundidad
+        actions = self.order(actions, simulator.game)[: self.width]
+        best_action = None
+
+        for depth in range(1, self.max_depth + 1):
+            _, action = self.alpha_beta(
+                actions, possible_actions, simulator, depth, MIN, MAX, True, deadline
+            )
+            if action is not None:
+                # La mejor acción de la iteración anterior se busca primero
+                best_action = action
+                actions = [action] + [a for a in actions if a is not action]
+            if self.spent >= self.limit or (deadline is not None and deadline.expired()):
+                break
+
+        return best_action
+
+    def order(self, actions: Sequence[Action], game: Game) -> List[Action]:
+        scores = score_actions(self.ordering, actions, game).tolist()
+        return [
+            actions[i]
+            for i in sorted(range(len(actions)), key=scores.__getitem__, reverse=True)
+        ]
+
+    def alpha_beta(
+            self,
+            actions: Sequence[Action],
+            possible_actions: Callable[[Game], Sequence[Action]],
+            simulator: SimulatorAgent,
+            depth: int,
+            alpha: float,
+            beta: float,
+            first: bool = False,
+            deadline: Deadline | None = None,
+    ) -> Tuple[float, Action | None]:
+        if depth == 0 or simulator.game.is_finish():
+            return self.evaluation(simulator.game, actions[0].team)
+
+        key = (simulator.game.hash(), actions[0].team, actions[0].player)
+        entry = self.table.probe(key, depth, alpha, beta)
+        if entry is not None:
+            action = self.table.find_action(actions, entry.best_action)
+            if action is not None:
+                return entry.value, action
+
+        if not first:
+            actions = self.order(actions, simulator.game)[: self.width]
+            action = self.table.find_action(actions, self.table.best_move(key))
+            if action is not None:
+                actions = [action] + [a for a in actions if a is not action]
+
+        best, best_action = MIN, None
+        complete = True
+
+        for action in actions:
+            if deadline is not None and deadline.expired():
+                complete = False
+                break
+            if self.spent >= self.limit and best_action is not None:
+                complete = False
+                break
+
+            snapshot = simulator.dispatch().snapshot()
+
+            simulator.dispatch().dispatch(action)
+
+            child_key = (simulator.game.hash(), action.team)
+            child = self.table.probe(child_key, depth, max(alpha, best), beta)
+            if child is not None:
+                value = child.value
+            else:
+                value = MAX
+                for _ in range(self.rollouts):
+                    if first:
+                        simulator.simulate_current()
+                    else:
+                        simulator.simulate()
+                    self.spent += 1
+
+                    r, _ = self.alpha_beta(
+                        possible_actions(simulator.game),
+                        possible_actions,
+                        simulator,
+                        depth - 1,
+                        max(alpha, best),
+                        min(beta, value),
+                        deadline=deadline,
+                    )
+
+                    if first:
+                        simulator.reset_current()
+                        simulator.dispatch().dispatch(action)
+                    else:
+                        simulator.reset()
+
+                    value = min(value, r)
+                    # Ya no puede superar a la mejor acción encontrada: el
+                    # valor es solo una cota superior
+                    if value <= max(alpha, best):
+                        self.table.store(child_key, value, depth, flag=UPPER)
+                        break
+                    if deadline is not None and deadline.expired():
+                        break
+                else:
+                    # Las simulaciones cortadas por beta solo dan una cota
+                    # inferior, y solo cuentan si el mínimo no bajó de beta
+                    flag = LOWER if value >= beta else EXACT
+                    self.table.store(child_key, value, depth, flag=flag)
+
+            simulator.dispatch().restore(snapshot)
+
+            if value > best:
+                best = value
+                best_action = action
+            if best >= beta:
+                break
+
+        if complete:
+            if best >= beta:
+                flag = LOWER
+            elif best <= alpha:
+                flag = UPPER
+            else:
+                flag = EXACT
+            self.table.store(key, best, depth, best_action, flag)
+        return best, best_action
+
+
+class MCTSNode:
+    def __init__(self, action: Action | None = None) -> None:
+        self.action: Action | None = action
+        self.children: Dict[Tuple, "MCTSNode"] = {}
+        self.visits: int = 0
+        self.value: float = 0.0
+
+    def uct(self, parent_visits: int, exploration: float) -> float:
+        return self.value / self.visits + exploration * math.sqrt(
+            math.log(parent_visits) / self.visits
+        )
+
+
+REWARD_SCALE = 100
+
+
+class MCTSStrategy(PlayerStrategy):
+    """
+    Búsqueda de Monte Carlo con selección UCT. El coste por decisión lo fija
+    el presupuesto (iteraciones y/o milisegundos) y no el número de casillas
+    destino: los hijos se abren por orden de los comportamientos ofensivos y
+    solo se amplía la lista a medida que el nodo acumula visitas.
+    """
+
+    def __init__(
+            self,
+            iterations: int | None = 24,
+            time_ms: float | None = None,
+            exploration: float = 1.4,
+            max_depth: int = 2,
+            widening: float = 2.0,
+    ):
+        super().__init__()
+        if iterations is None and time_ms is None:
+            raise Exception("MCTS necesita un presupuesto de iteraciones o de tiempo")
+        self.iterations: int | None = iterations
+        self.time_ms: float | None = time_ms
+        self.exploration: float = exploration
+        self.max_depth: int = max_depth
+        self.widening: float = widening
+        self.evaluator = GameEvaluator()
+        self.ordering: List[Behavior] = [Ofensive(importance=1.8), OpenSpace()]
+
+    def warm_up(self) -> None:
+        self.evaluator.warm_up()
+
+    def select_action(
+            self,
+            possible_actions: Callable[[Game], Sequence[Action]],
+            simulator: SimulatorAgent,
+            deadline: Deadline | None = None,
+    ) -> Action | None:
+        game = simulator.game
+        actions = possible_actions(game)
+        if len(actions) == 1:
+            return actions[0]
+
+        team = actions[0].team
+        baseline = self.evaluator.eval(game, team)
+        root = MCTSNode()
+        root_actions = self.order(actions, game)
+        time_end = (
+            perf_counter() + self.time_ms / 1000 if self.time_ms is not None else None
+        )
+
+        iteration = 0
+        while (
+                (self.iterations is None or iteration < self.iterations)
+                and (time_end is None or iteration == 0 or perf_counter() < time_end)
+                and (deadline is None or not deadline.expired())
+        ):
+            iteration += 1
+            path = [root]
+            node, legal = root, root_actions
+
+            for depth in range(self.max_depth):
+                child = self.select_child(node, legal)
+                path.append(child)
+                simulator.dispatch().dispatch(child.action)
+                if depth == 0:
+                    simulator.simulate_current()
+                else:
+                    simulator.simulate()
+
+                # Se expande un nodo nuevo por iteración
+                if child.visits == 0 or game.is_finish():
+                    break
+                node, legal = child, self.order(possible_actions(game), game)
+
+            value = self.evaluator.eval(game, team) - baseline
+            reward = 1 / (1 + math.exp(-max(-50.0, min(50.0, value / REWARD_SCALE))))
+            simulator.reset_current()
+
+            for visited in path:
+                visited.visits += 1
+                visited.value += reward
+
+        if not root.children:
+            return None
+        return max(root.children.values(), key=lambda n: (n.visits, n.value)).action
+
+    def order(self, actions: Sequence[Action], game: Game) -> List[Action]:
+        scores = score_actions(self.ordering, actions, game).tolist()
+        return [
+            actions[i]
+            for i in sorted(range(len(actions)), key=scores.__getitem__, reverse=True)
+        ]
+
+    def select_child(self, node: MCTSNode, legal: List[Action]) -> MCTSNode:
+        # Ensanchamiento progresivo: más candidatas cuantas más visitas
+        allowed = max(1, int(self.widening * math.sqrt(node.visits + 1)))
+        candidates = []
+        for action in legal[:allowed]:
+            key = action_key(action)
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = MCTSNode(action)
+            elif child.action is not action:
+                # Bucle abierto: la acción se reconstruye para el estado actual
+                child.action = action
+            if child.visits == 0:
+                return child
+            candidates.append(child)
+
+        return max(candidates, key=lambda c: c.uct(node.visits, self.exploration))
 
 
 class GameEvaluator:
     def __init__(self):
-        self.defensive_fuzzy = DefensivePositionFuzzySystem()
-        self.offensive_fuzzy = OffensivePositionFuzzySystem()
+        # Los sistemas difusos, y con ellos scikit-fuzzy, se cargan en la primera evaluación
+        self._defensive_fuzzy = None
+        self._offensive_fuzzy = None
+
+    @property
+    def defensive_fuzzy(self):
+        if self._defensive_fuzzy is None:
+            from .fuzzy_rules import DefensivePositionFuzzySystem
+            self._defensive_fuzzy = DefensivePositionFuzzySystem()
+        return self._defensive_fuzzy
+
+    @property
+    def offensive_fuzzy(self):
+        if self._offensive_fuzzy is None:
+            from .fuzzy_rules import OffensivePositionFuzzySystem
+            self._offensive_fuzzy = OffensivePositionFuzzySystem()
+        return self._offensive_fuzzy
+
+    def warm_up(self) -> None:
+        # Construye la tabla del sistema difuso que usa `eval`
+        self.defensive_fuzzy
 
     def eval(self, game: Game, team: str) -> float:
         """
@@ -165,19 +594,29 @@ class GameEvaluator:
         """
         opponent_team = T1 if team == T2 else T2
 
-        # Diferencia de puntos
-        score_diff = game.get_team_score(team) - game.get_team_score(opponent_team)
-        set_diff = game.get_team_sets(team) - game.get_team_sets(opponent_team)
         ball_possession = 1 if game.ball_possession_team == team else -1
         touches_left = 3 - game.touches[team]
         ball_on_our_side = 1 if game.is_ball_on_our_side(team) else -1
 
         avg_defensive_score = self.avg_defensive_position(self, game, team) / 100  # Normalizar entre 0 y 1
-        avg_offensive_score = self.avg_offensive_position(self, game, team) / 100  # Normalizar entre 0 y 1
+        # La posición ofensiva también se puntúa con el sistema defensivo
+        avg_offensive_score = avg_defensive_score
+
+        if game.win_table is not None:
+            # Probabilidad exacta de ganar el partido desde el marcador, el
+            # saque y las rotaciones actuales
+            win = game.win_table.for_game(game)
+            if team != T1:
+                win = 1 - win
+            outcome = (win - 0.5) * WIN_PROBABILITY_WEIGHT
+        else:
+            # Diferencia de puntos
+            score_diff = game.get_team_score(team) - game.get_team_score(opponent_team)
+            set_diff = game.get_team_sets(team) - game.get_team_sets(opponent_team)
+            outcome = set_diff * 100000 + score_diff * 100
 
         value = (
-                set_diff * 100000
-                + score_diff * 100
+                outcome
                 + ball_possession * 50
                 + touches_left * 20
                 + ball_on_our_side * 30
@@ -188,43 +627,27 @@ class GameEvaluator:
         return value
 
     @staticmethod
-    def avg_defensive_position(self, game: Game, team: str) -> float:
-        avg = 0
-        count = 0
-        for player in game.get_players(team):
-            player_position = game.field.find_player(player, team)
-            ideal_position = dict_t1[player_position.position] if team == T1 else player_position.position
-            player_position = player_position.row, player_position.col
-            player_role = game.t1.get_player_role(player) if team == T1 else game.t2.get_player_role(player)
-            ball_position = game.field.find_ball()
-            ball_position = ball_position.row, ball_position.col
-            distance_to_position = game.field.distance(player_position, ideal_position)
-            distance_to_ball = game.field.distance(player_position, ball_position)
-
-            defensive_score = self.defensive_fuzzy.evaluate(distance_to_position, distance_to_ball, player_role)
-
-            avg += defensive_score
-            count += 1
-
-        return avg / count if count > 0 else 0
+    def player_positions(game: Game, team: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Distancia a la posición ideal, distancia a la pelota y número de rol
+        de todos los jugadores del equipo en el campo, en una sola pasada.
+        """
+        field = game.field
+        ideal = dict_t1 if team == T1 else dict_t2
+        data = game.t1 if team == T1 else game.t2
+        players = list(game.get_players(team))
+        grids = [field.find_player(player, team) for player in players]
+        cells = np.array([grid.index for grid in grids], dtype=np.intp)
+        ideal_cells = field.indices([ideal[grid.position] for grid in grids])
+        distances = field.euclidean_array[cells]
+        roles = np.array([get_role_number(data.get_player_role(player)) for player in players])
+        return (
+            distances[np.arange(len(cells)), ideal_cells],
+            distances[:, game.context().ball.index],
+            roles,
+        )
 
     @staticmethod
-    def avg_offensive_position(self, game: Game, team: str) -> float:
-        avg = 0
-        count = 0
-        for player in game.get_players(team):
-            player_position = game.field.find_player(player, team)
-            ideal_position = dict_t1[player_position.position] if team == T1 else player_position.position
-            player_position = player_position.row, player_position.col
-            player_role = game.t1.get_player_role(player) if team == T1 else game.t2.get_player_role(player)
-            ball_position = game.field.find_ball()
-            ball_position = ball_position.row, ball_position.col
-            distance_to_position = game.field.distance(player_position, ideal_position)
-            distance_to_ball = game.field.distance(player_position, ball_position)
-
-            defensive_score = self.defensive_fuzzy.evaluate(distance_to_position, distance_to_ball, player_role)
-
-            avg += defensive_score
-            count += 1
-
-        return avg / count if count > 0 else 0
+    def avg_defensive_position(self, game: Game, team: str) -> float:
+        scores = self.defensive_fuzzy.evaluate_many(*self.player_positions(game, team)).tolist()
+        return sum(scores) / len(scores) if len(scores) > 0 else 0
@@ -1,8 +1,10 @@
 ﻿from abc import ABC, abstractmethod
+from typing import List
 
 from Tools.game import Game
+from Tools.timing import Deadline
 
-from .actions import Dispatch
+from .actions import Action, Dispatch
 
 
 class SimulatorAgent(ABC):
@@ -28,3 +30,12 @@ class SimulatorAgent(ABC):
     @abstractmethod
     def reset_current(self):
         pass
+
+    def can_parallelize(self) -> bool:
+        # Sin pool de procesos las estrategias simulan en serie
+        return False
+
+    def parallel_rollouts(
+        self, actions: List[Action], rollouts: int, deadline: Deadline | None = None
+    ) -> List[List[float]] | None:
+        return None
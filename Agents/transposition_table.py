@@ -0,0 +1,133 @@
+import math
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+
+from .actions import Action
+
+TT_SIZE = 1 << 16
+
+# Tipo de valor guardado: exacto, cota inferior (corte por beta) o cota
+# superior (ninguna acción superó a alfa)
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+def action_key(action: Action) -> Tuple[str, Tuple[int, int], Tuple[int, int]]:
+    # Las acciones se reconstruyen en cada turno, se guardan por su descripción
+    return action.__class__.__name__, action.src, action.dest
+
+
+class TTEntry:
+    def __init__(
+        self, value: float, depth: int, best_action: Optional[Tuple], flag: int = EXACT
+    ) -> None:
+        self.value: float = value
+        self.depth: int = depth
+        self.best_action: Optional[Tuple] = best_action
+        self.flag: int = flag
+
+    def fits(self, alpha: float, beta: float) -> bool:
+        # Una cota solo sirve si basta para decidir con la ventana actual
+        if self.flag == LOWER:
+            return self.value >= beta
+        if self.flag == UPPER:
+            return self.value <= alpha
+        return True
+
+
+class TranspositionTable:
+    """
+    Tabla de transposición acotada con dos cubetas: una que prefiere las
+    entradas más profundas y otra que siempre reemplaza. Cada cubeta expulsa
+    la entrada usada hace más tiempo cuando se llena.
+    """
+
+    def __init__(self, size: int = TT_SIZE) -> None:
+        self.size: int = size
+        self.depth_preferred: OrderedDict[Hashable, TTEntry] = OrderedDict()
+        self.always_replace: OrderedDict[Hashable, TTEntry] = OrderedDict()
+        self.probes: int = 0
+        self.hits: int = 0
+        self.stores: int = 0
+        self.evictions: int = 0
+
+    def probe(
+        self, key: Hashable, depth: int, alpha: float = -math.inf, beta: float = math.inf
+    ) -> Optional[TTEntry]:
+        self.probes += 1
+        for bucket in (self.depth_preferred, self.always_replace):
+            entry = bucket.get(key)
+            if entry is not None and entry.depth >= depth and entry.fits(alpha, beta):
+                bucket.move_to_end(key)
+                self.hits += 1
+                return entry
+        return None
+
+    def store(
+        self,
+        key: Hashable,
+        value: float,
+        depth: int,
+        best_action: Optional[Action] = None,
+        flag: int = EXACT,
+    ) -> None:
+        self.stores += 1
+        entry = TTEntry(
+            value, depth, action_key(best_action) if best_action is not None else None, flag
+        )
+        current = self.depth_preferred.get(key)
+        if current is None or depth >= current.depth:
+            bucket = self.depth_preferred
+            self.always_replace.pop(key, None)
+        else:
+            bucket = self.always_replace
+        bucket[key] = entry
+        bucket.move_to_end(key)
+        if len(bucket) > self.size // 2:
+            bucket.popitem(last=False)
+            self.evictions += 1
+
+    def best_move(self, key: Hashable) -> Optional[Tuple]:
+        # Para ordenar sirve la mejor acción de cualquier entrada, sea cual
+        # sea su profundidad o su tipo
+        for bucket in (self.depth_preferred, self.always_replace):
+            entry = bucket.get(key)
+            if entry is not None and entry.best_action is not None:
+                return entry.best_action
+        return None
+
+    @staticmethod
+    def find_action(actions: Sequence[Action], best_action: Optional[Tuple]) -> Optional[Action]:
+        if best_action is None:
+            return None
+        for action in actions:
+            if action_key(action) == best_action:
+                return action
+        return None
+
+    def clear(self) -> None:
+        self.depth_preferred.clear()
+        self.always_replace.clear()
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hit_rate(),
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(self.depth_preferred) + len(self.always_replace),
+            "size": self.size,
+        }
+
+    def report(self) -> str:
+        return (
+            f"Tabla de transposición: {self.hits}/{self.probes} aciertos "
+            f"({self.hit_rate():.1%}), {self.stores} guardadas, "
+            f"{self.evictions} expulsadas, "
+            f"{len(self.depth_preferred) + len(self.always_replace)}/{self.size} ocupadas"
+        )
@@ -1,22 +1,31 @@
-from typing import List
+from typing import TYPE_CHECKING, List
 
-from pandas import DataFrame
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 from Agents.manager_agent import Manager
 from Agents.player_agent import Player
 from Agents.team import TeamAgent
 from Simulator.simulation_params import SimulationParams
-from Simulator.simulator import VolleyballSimulation
+from Simulator.lockstep import LockstepResult, LockstepSimulator
+from Simulator.simulator import AGENTS, MARKOV, VolleyballSimulation
 from Tools.data import PlayerData, TeamData
 from Tools.enum import T1, T2
 
 
-def get_data(team: str, df: DataFrame) -> List[PlayerData]:
+def get_data(team: str, df: "DataFrame") -> List[PlayerData]:
     data = df[df["Team"] == team]
     return [PlayerData(p) for _, p in data.iterrows()]
 
 
-def conf_game(params: SimulationParams, df: DataFrame) -> VolleyballSimulation:
+def conf_game(
+    params: SimulationParams,
+    df: "DataFrame",
+    decision_ms: float | None = None,
+    workers: int = 0,
+    seed: int | None = None,
+    engine: str = AGENTS,
+) -> VolleyballSimulation:
     T1_n, T2_n = params.names
     t1_line_up, t2_line_up = params.managers_line_up
     T1_action, T2_action = params.managers_action
@@ -42,7 +51,23 @@ def conf_game(params: SimulationParams, df: DataFrame) -> VolleyballSimulation:
     T2_team_agent = TeamAgent(T2_n, T2_manager, T2_players_agents)
 
     simulation = VolleyballSimulation(
-        (T1_team_agent, T1_data), (T2_team_agent, T2_data)
+        (T1_team_agent, T1_data),
+        (T2_team_agent, T2_data),
+        decision_ms=decision_ms,
+        workers=workers,
+        seed=seed,
+        engine=engine,
     )
 
     return simulation
+
+
+def simulate_many(
+    params: SimulationParams, df: "DataFrame", n: int, seed: int | None = None
+) -> LockstepResult:
+    """
+    Juega `n` partidos del emparejamiento a la vez con el motor de Markov
+    en arreglos de numpy. Las estrategias de los agentes no intervienen.
+    """
+    simulation = conf_game(params, df, seed=seed, engine=MARKOV)
+    return LockstepSimulator(simulation.t1, simulation.t2, simulation.game).run(n, seed)
@@ -0,0 +1,309 @@
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Agents.team import TeamAgent
+from Simulator.markov import (ATTACK, BLOCK, DIG, RECEIVE, SERVE, SET,
+                              MarkovSimulator, Touch, team_roles,
+                              touch_candidates)
+from Tools.game import Game
+from Tools.win_probability import FIFTH_SET_T1_SERVE, ROTATIONS
+
+# Fase de la jugada en la que está cada partido
+SERVING, FIRST, SETTING, ATTACKING, BLOCKING = range(5)
+
+# Contadores por jugador, con los nombres de PlayerStatistics
+PLAYER_COUNTERS = (
+    "points",
+    "aces",
+    "errors",
+    "serves",
+    "total_serves",
+    "receives",
+    "total_receives",
+    "sets",
+    "total_sets",
+    "attacks",
+    "total_attacks",
+    "blocks",
+    "total_blocks",
+    "digs",
+    "total_digs",
+)
+COUNTER_INDEX: Dict[str, int] = {name: i for i, name in enumerate(PLAYER_COUNTERS)}
+
+# Cuantil de la normal para intervalos de confianza del 95 %
+Z_95 = 1.96
+
+
+class LockstepResult:
+    """
+    Resultado de N partidos de un mismo emparejamiento: sets de cada equipo
+    por partido y contadores de cada jugador por partido, en arreglos.
+    """
+
+    def __init__(
+        self,
+        names: Tuple[str, str],
+        dorsals: Tuple[List[int], List[int]],
+        sets: np.ndarray,
+        stats: np.ndarray,
+        elapsed: float,
+    ) -> None:
+        self.names: Tuple[str, str] = names
+        self.dorsals: Tuple[List[int], List[int]] = dorsals
+        # [partido, equipo]
+        self.sets: np.ndarray = sets
+        # [partido, equipo, jugador, contador]
+        self.stats: np.ndarray = stats
+        self.elapsed: float = elapsed
+
+    @property
+    def matches(self) -> int:
+        return len(self.sets)
+
+    def win_rate(self) -> float:
+        return float(np.mean(self.sets[:, 0] > self.sets[:, 1])) if self.matches else 0.0
+
+    def set_distribution(self) -> Dict[str, float]:
+        counts = Counter(f"{t1}-{t2}" for t1, t2 in self.sets.tolist())
+        return {score: counts[score] / self.matches for score in sorted(counts)}
+
+    def player_means(self) -> Dict[Tuple[str, int, str], Tuple[float, float]]:
+        # (equipo, dorsal, estadística) -> (media, semiamplitud del 95 %)
+        means = self.stats.mean(axis=0)
+        halves = np.zeros_like(means)
+        if self.matches > 1:
+            halves = Z_95 * self.stats.std(axis=0, ddof=1) / np.sqrt(self.matches)
+
+        result = {}
+        for team, (name, dorsals) in enumerate(zip(self.names, self.dorsals)):
+            for index, dorsal in enumerate(dorsals):
+                for counter, stat in enumerate(PLAYER_COUNTERS):
+                    result[(name, dorsal, stat)] = (
+                        float(means[team, index, counter]),
+                        float(halves[team, index, counter]),
+                    )
+        return result
+
+
+class LockstepSimulator:
+    """
+    Juega muchos partidos del mismo emparejamiento a la vez con la cadena
+    de toques del motor de Markov. Marcador, sets, saque, rotaciones y fase
+    de la jugada de cada partido viven en arreglos de numpy y en cada vuelta
+    se resuelve de una vez el toque de todos los partidos que están en la
+    misma fase.
+    """
+
+    def __init__(self, team1: TeamAgent, team2: TeamAgent, game: Game) -> None:
+        self.game: Game = game
+        MarkovSimulator(team1, team2, game).conf_line_ups()
+
+        teams = (game.t1, game.t2)
+        self.dorsals: Tuple[List[int], List[int]] = tuple(list(data.data) for data in teams)
+        # Índice del jugador "ninguno" en las tablas de excluidos
+        self.none: int = max(len(dorsals) for dorsals in self.dorsals)
+
+        # Probabilidad de acierto de cada jugador en cada toque
+        self.skills: Dict[Touch, np.ndarray] = {}
+        for touch in (SERVE, RECEIVE, SET, ATTACK, BLOCK, DIG):
+            skills = np.zeros((2, self.none))
+            for team, data in enumerate(teams):
+                for index, dorsal in enumerate(self.dorsals[team]):
+                    skills[team, index] = getattr(data.data[dorsal], touch[0]) / 100
+            self.skills[touch] = skills
+
+        # Candidatos a cada toque por equipo y jugador excluido
+        self.counts: Dict[Touch, np.ndarray] = {}
+        self.candidates: Dict[Touch, np.ndarray] = {}
+        for touch in (RECEIVE, SET, ATTACK, BLOCK, DIG):
+            counts = np.ones((2, self.none + 1), dtype=np.intp)
+            candidates = np.zeros((2, self.none + 1, self.none), dtype=np.intp)
+            for team, data in enumerate(teams):
+                roles = team_roles(data)
+                dorsals = self.dorsals[team]
+                for excluded, dorsal in enumerate(dorsals):
+                    players = touch_candidates(data, roles, touch, dorsal)
+                    self._fill(counts, candidates, team, excluded, players)
+                players = touch_candidates(data, roles, touch)
+                self._fill(counts, candidates, team, self.none, players)
+            self.counts[touch] = counts
+            self.candidates[touch] = candidates
+
+        # Jugador que saca en cada rotación: tras r rotaciones, el que empezó en r + 1
+        self.servers: np.ndarray = np.zeros((2, ROTATIONS), dtype=np.intp)
+        for team, data in enumerate(teams):
+            for grid in data.line_up.line_up.values():
+                self.servers[team, grid.slot - 1] = self.dorsals[team].index(grid.player)
+
+    def _fill(self, counts, candidates, team: int, excluded: int, players: List[int]) -> None:
+        indices = [self.dorsals[team].index(player) for player in players]
+        counts[team, excluded] = len(indices)
+        candidates[team, excluded, :len(indices)] = indices
+
+    def run(self, n: int, seed: int | None = None) -> LockstepResult:
+        start = time.perf_counter()
+        game = self.game
+        self.rng: np.random.Generator = np.random.Generator(np.random.PCG64(seed))
+
+        self.live: np.ndarray = np.ones(n, dtype=bool)
+        self.sets: np.ndarray = np.zeros((n, 2), dtype=np.intp)
+        self.score: np.ndarray = np.zeros((n, 2), dtype=np.intp)
+        self.rotation: np.ndarray = np.zeros((n, 2), dtype=np.intp)
+        # Equipos como 0 (T1) y 1 (T2); el primer saque es el de coin_toss
+        self.serving: np.ndarray = (self.rng.random(n) >= FIFTH_SET_T1_SERVE).astype(np.intp)
+        self.possession: np.ndarray = self.serving.copy()
+        self.phase: np.ndarray = np.full(n, SERVING, dtype=np.intp)
+        self.first_dig: np.ndarray = np.zeros(n, dtype=bool)
+        self.excluded: np.ndarray = np.full(n, self.none, dtype=np.intp)
+        self.last_team: np.ndarray = np.full(n, -1, dtype=np.intp)
+        self.last_player: np.ndarray = np.full(n, -1, dtype=np.intp)
+        self.touches: np.ndarray = np.zeros(n, dtype=np.intp)
+        self.stats: np.ndarray = np.zeros((n, 2, self.none, len(PLAYER_COUNTERS)), dtype=np.int32)
+
+        while self.live.any():
+            self.serve_phase()
+            self.first_phase()
+            self.set_phase()
+            self.attack_phase()
+            self.block_phase()
+
+        return LockstepResult(
+            (game.t1.name, game.t2.name),
+            self.dorsals,
+            self.sets,
+            self.stats,
+            time.perf_counter() - start,
+        )
+
+    def in_phase(self, phase: int) -> np.ndarray:
+        return np.flatnonzero(self.live & (self.phase == phase))
+
+    def serve_phase(self):
+        matches = self.in_phase(SERVING)
+        team = self.serving[matches]
+        player = self.servers[team, self.rotation[matches, team]]
+        success = self.resolve(SERVE, matches, team, player)
+
+        served = matches[success]
+        self.possession[served] = 1 - team[success]
+        self.phase[served] = FIRST
+        self.first_dig[served] = False
+        self.score_point(matches[~success], 1 - team[~success])
+
+    def first_phase(self):
+        matches = self.in_phase(FIRST)
+        for touch, dig in ((RECEIVE, False), (DIG, True)):
+            group = matches[self.first_dig[matches] == dig]
+            team = self.possession[group]
+            player = self.pick(touch, team, np.full(len(group), self.none))
+            success = self.resolve(touch, group, team, player)
+
+            played = group[success]
+            self.phase[played] = SETTING
+            self.excluded[played] = player[success]
+            self.score_point(group[~success], 1 - team[~success])
+
+    def set_phase(self):
+        matches = self.in_phase(SETTING)
+        team = self.possession[matches]
+        player = self.pick(SET, team, self.excluded[matches])
+        success = self.resolve(SET, matches, team, player)
+
+        played = matches[success]
+        self.phase[played] = ATTACKING
+        self.excluded[played] = player[success]
+        self.score_point(matches[~success], 1 - team[~success])
+
+    def attack_phase(self):
+        matches = self.in_phase(ATTACKING)
+        team = self.possession[matches]
+        player = self.pick(ATTACK, team, self.excluded[matches])
+        success = self.resolve(ATTACK, matches, team, player)
+
+        self.phase[matches[success]] = BLOCKING
+        self.score_point(matches[~success], 1 - team[~success])
+
+    def block_phase(self):
+        # El bloqueo que toca la pelota la deja en el campo del que bloquea,
+        # si no, la tiene que defender
+        matches = self.in_phase(BLOCKING)
+        team = 1 - self.possession[matches]
+        player = self.pick(BLOCK, team, np.full(len(matches), self.none))
+        success = self.resolve(BLOCK, matches, team, player)
+
+        self.possession[matches] = team
+        self.phase[matches] = np.where(success, SETTING, FIRST)
+        self.first_dig[matches] = ~success
+        self.excluded[matches] = self.none
+
+    def pick(self, touch: Touch, team: np.ndarray, excluded: np.ndarray) -> np.ndarray:
+        counts = self.counts[touch][team, excluded]
+        choice = (self.rng.random(len(team)) * counts).astype(np.intp)
+        return self.candidates[touch][team, excluded, choice]
+
+    def resolve(self, touch: Touch, matches: np.ndarray, team: np.ndarray, player: np.ndarray) -> np.ndarray:
+        _, made, attempts = touch
+        success = self.rng.random(len(matches)) <= self.skills[touch][team, player]
+
+        stats = self.stats
+        stats[matches, team, player, COUNTER_INDEX[attempts]] += 1
+        stats[matches[success], team[success], player[success], COUNTER_INDEX[made]] += 1
+        stats[matches[~success], team[~success], player[~success], COUNTER_INDEX["errors"]] += 1
+
+        # Como en el motor de Markov, los fallos no cambian el último toque
+        touched = matches[success]
+        self.last_team[touched] = team[success]
+        self.last_player[touched] = player[success]
+        self.touches[touched] += 1
+        return success
+
+    def score_point(self, matches: np.ndarray, scorer: np.ndarray):
+        if len(matches) == 0:
+            return
+        game = self.game
+        self.score[matches, scorer] += 1
+
+        # El punto se apunta al último toque bueno del equipo que lo gana
+        credited = self.last_team[matches] == scorer
+        player = self.last_player[matches[credited]]
+        self.stats[matches[credited], scorer[credited], player, COUNTER_INDEX["points"]] += 1
+        ace = self.touches[matches[credited]] <= 1
+        self.stats[
+            matches[credited][ace], scorer[credited][ace], player[ace], COUNTER_INDEX["aces"]
+        ] += 1
+
+        # Quien gana el saque del rival rota
+        side_out = self.serving[matches] != scorer
+        rotating, rotated = matches[side_out], scorer[side_out]
+        self.rotation[rotating, rotated] = (self.rotation[rotating, rotated] + 1) % ROTATIONS
+        self.serving[rotating] = rotated
+
+        t1_score, t2_score = self.score[matches, 0], self.score[matches, 1]
+        ended = (
+            (np.maximum(t1_score, t2_score) >= game.points_to_win_set)
+            & (np.abs(t1_score - t2_score) >= 2)
+        )
+        finished_set = matches[ended]
+        self.sets[finished_set, (t2_score > t1_score)[ended].astype(np.intp)] += 1
+        self.score[finished_set] = 0
+        over = (self.sets[finished_set] == game.sets_to_win).any(axis=1)
+        self.live[finished_set[over]] = False
+
+        # Saque del set siguiente como en Game.end_set
+        next_set = finished_set[~over]
+        current_set = self.sets[next_set].sum(axis=1) + 1
+        toss = (self.rng.random(len(next_set)) >= FIFTH_SET_T1_SERVE).astype(np.intp)
+        self.serving[next_set] = np.where(
+            current_set == game.max_sets, toss, (current_set % 2 == 0).astype(np.intp)
+        )
+
+        self.phase[matches] = SERVING
+        self.excluded[matches] = self.none
+        self.last_team[matches] = -1
+        self.last_player[matches] = -1
+        self.touches[matches] = 0
+        self.possession[matches] = self.serving[matches]
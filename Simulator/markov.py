@@ -0,0 +1,277 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Agents.actions import Dispatch
+from Agents.simulator_agent import SimulatorAgent
+from Agents.team import TeamAgent
+from Tools.data import TeamData
+from Tools.enum import T1, T2
+from Tools.game import Game
+from Tools.utils import coin_toss
+from Tools.win_probability import ROTATIONS, WinProbabilityTable
+
+Touch = Tuple[str, str, str]
+
+# Toque -> (habilidad de PlayerData, acierto, intentos) en las estadísticas
+SERVE = ("p_serve", "serves", "total_serves")
+RECEIVE = ("p_receive", "receives", "total_receives")
+SET = ("p_set", "sets", "total_sets")
+ATTACK = ("p_attack", "attacks", "total_attacks")
+BLOCK = ("p_block", "blocks", "total_blocks")
+DIG = ("p_dig", "digs", "total_digs")
+
+# Roles que hacen cada toque, por orden de preferencia; si no hay ninguno
+# en el campo lo hace cualquiera
+TOUCH_ROLES: Dict[Touch, Tuple[str, ...]] = {
+    RECEIVE: ("L", "OH"),
+    DIG: ("L", "OH"),
+    SET: ("S",),
+    ATTACK: ("OH", "O", "MB"),
+    BLOCK: ("MB", "O"),
+}
+
+# Tablas de probabilidad de victoria guardadas; cada una ocupa unos 3,5 MB
+WIN_TABLE_CACHE = 16
+
+
+def team_roles(data: TeamData) -> Dict[str, List[int]]:
+    roles = {}
+    for player in sorted(data.on_field):
+        roles.setdefault(data.get_player_role(player), []).append(player)
+    return roles
+
+
+def touch_candidates(
+    data: TeamData, roles: Dict[str, List[int]], touch: Touch, excluded: int | None = None
+) -> List[int]:
+    for role in TOUCH_ROLES[touch]:
+        candidates = [p for p in roles.get(role, []) if p != excluded]
+        if candidates:
+            return candidates
+    return [p for p in sorted(data.on_field) if p != excluded]
+
+
+def touch_skill(data: TeamData, player: int, touch: Touch) -> float:
+    return getattr(data.data[player], touch[0]) / 100
+
+
+def chain_probability(data: TeamData, roles: Dict[str, List[int]], first: Touch | None) -> float:
+    """
+    Probabilidad de que el equipo complete primer toque, colocación y ataque
+    con los mismos sorteos de jugadores que hace el motor.
+    """
+
+    def set_and_attack(excluded: int | None) -> float:
+        setters = touch_candidates(data, roles, SET, excluded)
+        total = 0.0
+        for setter in setters:
+            attackers = touch_candidates(data, roles, ATTACK, setter)
+            attack = sum(touch_skill(data, a, ATTACK) for a in attackers) / len(attackers)
+            total += touch_skill(data, setter, SET) * attack
+        return total / len(setters)
+
+    if first is None:
+        return set_and_attack(None)
+    players = touch_candidates(data, roles, first)
+    return sum(touch_skill(data, p, first) * set_and_attack(p) for p in players) / len(players)
+
+
+def serve_win_rates(t1: TeamData, t2: TeamData) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Probabilidad de que cada equipo gane la jugada cuando saca, por rotación,
+    según la cadena de toques del motor y los jugadores en el campo.
+    """
+    teams = (t1, t2)
+    roles = [team_roles(data) for data in teams]
+    # Completar el primer toque (defensa o pelota bloqueada), la colocación
+    # y el ataque, y bloquear, para cada equipo
+    dig = [chain_probability(data, r, DIG) for data, r in zip(teams, roles)]
+    free = [chain_probability(data, r, None) for data, r in zip(teams, roles)]
+    block = [
+        np.mean([touch_skill(data, p, BLOCK) for p in touch_candidates(data, r, BLOCK)])
+        for data, r in zip(teams, roles)
+    ]
+
+    # Probabilidad de ganar el punto con la pelota tras defender (d) o tras
+    # bloquear (n): x = A * (1 - B' * n' - (1 - B') * d'), con ' el rival
+    system = np.eye(4)
+    constants = np.zeros(4)
+    for team in range(2):
+        other = 1 - team
+        for row, chain in ((2 * team, dig[team]), (2 * team + 1, free[team])):
+            system[row, 2 * other] += chain * (1 - block[other])
+            system[row, 2 * other + 1] += chain * block[other]
+            constants[row] = chain
+    wins = np.linalg.solve(system, constants)
+
+    rates = []
+    for team in range(2):
+        data, other = teams[team], 1 - team
+        receive = chain_probability(teams[other], roles[other], RECEIVE)
+        # Tras el ataque del que recibe, el que sacó bloquea o defiende
+        receive *= 1 - block[team] * wins[2 * team + 1] - (1 - block[team]) * wins[2 * team]
+        servers = [
+            # Tras r rotaciones saca el jugador que empezó en la posición r + 1
+            next(g.player for g in data.line_up.line_up.values() if g.slot == r + 1)
+            for r in range(ROTATIONS)
+        ]
+        rates.append(np.array([touch_skill(data, s, SERVE) * (1 - receive) for s in servers]))
+    return rates[0], rates[1]
+
+
+@lru_cache(maxsize=WIN_TABLE_CACHE)
+def cached_win_table(
+    t1_rates: Tuple[float, ...],
+    t2_rates: Tuple[float, ...],
+    points_to_win_set: int,
+    sets_to_win: int,
+) -> WinProbabilityTable:
+    return WinProbabilityTable(t1_rates, t2_rates, points_to_win_set, sets_to_win)
+
+
+def win_table(game: Game) -> WinProbabilityTable:
+    # Partidos con los mismos jugadores en el campo comparten la tabla
+    t1_rates, t2_rates = serve_win_rates(game.t1, game.t2)
+    return cached_win_table(
+        tuple(t1_rates), tuple(t2_rates), game.points_to_win_set, game.sets_to_win
+    )
+
+
+class MarkovLineUp(SimulatorAgent):
+    # El motor de Markov no simula por adelantado: los line-ups se eligen
+    # solo con los datos del partido
+    def simulate(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def simulate_current(self):
+        pass
+
+    def reset_current(self):
+        pass
+
+    def dispatch(self) -> Dispatch:
+        pass
+
+
+class MarkovSimulator:
+    """
+    Motor alternativo que resuelve cada jugada como una cadena de toques
+    (saque, recepción, colocación, ataque, bloqueo o defensa) sobre la
+    rotación actual. Cada toque sale bien con la probabilidad del jugador en
+    `PlayerData` y el primer fallo da el punto al rival. No usa el campo ni
+    los agentes; el marcador, las rotaciones y las estadísticas son los del
+    `Game`.
+    """
+
+    def __init__(self, team1: TeamAgent, team2: TeamAgent, game: Game) -> None:
+        self.team1: TeamAgent = team1
+        self.team2: TeamAgent = team2
+        self.game: Game = game
+        self.game.use_field = False
+        # Jugadores en el campo de cada equipo por rol
+        self.roles: Dict[str, Dict[str, List[int]]] = {}
+
+    def start_match(self):
+        self.game.instance = 0
+        self.conf_line_ups()
+
+        self.game.serving_team = T1 if coin_toss(self.game.rng) else T2
+        self.game.ball_possession_team = self.game.serving_team
+        if not self.game.headless:
+            print(f"Sirve {self.game.serving_team}")
+
+        self.game.instance = 1
+
+    def conf_line_ups(self):
+        t1_lineup = self.team1.manager.get_line_up(MarkovLineUp(self.game))
+        t2_lineup = self.team2.manager.get_line_up(MarkovLineUp(self.game))
+        self.game.conf_line_ups(t1_lineup, t2_lineup)
+
+        for team in (T1, T2):
+            self.roles[team] = team_roles(self.team_data(team))
+
+    def simulate_rally(self, mask=None):
+        game = self.game
+        serving = game.serving_team
+        receiving = T2 if serving == T1 else T1
+
+        game.last_player_touched = None
+        game.last_team_touched = None
+        game.general_touches = 0
+
+        server = self.team_data(serving).line_up.line_up[1].player
+        if self.touch(serving, server, SERVE):
+            scorer = self.play_ball(receiving, RECEIVE)
+        else:
+            scorer = receiving
+
+        game.score_point(scorer)
+        game.instance += 1
+        # No hay nada que deshacer entre jugadas
+        game.journal.clear()
+
+    def play_ball(self, team: str, first: Touch | None) -> str:
+        # `team` recibe la pelota del rival; devuelve el equipo que gana el punto
+        while True:
+            opponent = T2 if team == T1 else T1
+
+            # Sin primer toque cuando el bloqueo ya dejó la pelota en su campo
+            first_player = None
+            if first is not None:
+                first_player = self.pick(team, first)
+                if not self.touch(team, first_player, first):
+                    return opponent
+            setter = self.pick(team, SET, first_player)
+            if not self.touch(team, setter, SET):
+                return opponent
+            attacker = self.pick(team, ATTACK, setter)
+            if not self.touch(team, attacker, ATTACK):
+                return opponent
+
+            blocked = self.touch(opponent, self.pick(opponent, BLOCK), BLOCK)
+            team, first = opponent, None if blocked else DIG
+
+    def pick(self, team: str, touch: Touch, excluded: int | None = None) -> int:
+        candidates = touch_candidates(self.team_data(team), self.roles[team], touch, excluded)
+        return self.game.rng.choice(candidates)
+
+    def touch(self, team: str, player: int, touch: Touch) -> bool:
+        skill, made, attempts = touch
+        game = self.game
+        data = self.team_data(team)
+        player_data = data.data[player]
+        success = game.rng.random() <= getattr(player_data, skill) / 100
+
+        if success:
+            # Los fallos no cambian quién tocó el último: el punto se le
+            # apunta al último toque bueno del equipo que lo gana
+            game.last_player_touched = player
+            game.last_team_touched = team
+            game.general_touches += 1
+        else:
+            player_data.errors += 1
+
+        if not game.headless:
+            player_stats = data.players_statistics[player]
+            setattr(player_stats, attempts, getattr(player_stats, attempts) + 1)
+            if success:
+                setattr(player_stats, made, getattr(player_stats, made) + 1)
+                setattr(data.statistics, made, getattr(data.statistics, made) + 1)
+            else:
+                player_stats.errors += 1
+                data.statistics.errors += 1
+        return success
+
+    def team_data(self, team: str) -> TeamData:
+        return self.game.t1 if team == T1 else self.game.t2
+
+    def checkpoint(self):
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,143 @@
+import multiprocessing as mp
+from array import array
+from math import ceil
+from time import time
+from typing import Hashable, List, Set, Tuple
+
+from Agents import actions as player_actions
+from Agents.actions import Action, Nothing, Substitution
+from Agents.player_strategy import GameEvaluator
+from Tools.enum import T1, T2
+from Tools.game import Game
+from Tools.packed_state import pack, unpack
+from Tools.timing import Deadline
+
+ActionDescriptor = Tuple[str, Tuple[int, int], Tuple[int, int], int, str]
+RolloutTask = Tuple[array, Set[Tuple[int, str]], ActionDescriptor, int, int, float | None]
+
+# Estado de cada proceso del pool: su propia copia del simulador y un evaluador
+_worker = None
+
+
+def describe(action: Action) -> ActionDescriptor:
+    return action.__class__.__name__, action.src, action.dest, action.player, action.team
+
+
+def build(descriptor: ActionDescriptor, game: Game) -> Action:
+    name, src, dest, player, team = descriptor
+    cls = getattr(player_actions, name)
+    if cls is Nothing:
+        return Nothing(player, team, game)
+    return cls(src, dest, player, team, game)
+
+
+def roster(simulator) -> Hashable:
+    """
+    Plantilla de los dos equipos y cambios pendientes de aplicar. Los
+    procesos la reciben al arrancar y `pack` no la restaura entera (los
+    cambios pendientes viven en la pila de acciones perezosas), así que si
+    cambia hay que volver a arrancarlos.
+    """
+    teams = []
+    for team in (T1, T2):
+        data = simulator.game.t1 if team == T1 else simulator.game.t2
+        teams.append(
+            (
+                tuple(sorted(data.on_field)),
+                tuple(sorted(data.on_bench)),
+                tuple(sorted(data.unavailable)),
+                tuple(data.substitution_history),
+            )
+        )
+    pending = tuple(
+        (action.team, action.player_out, action.player_in, action.not_execute)
+        for action in simulator.dispatch.lazy_stack
+        if isinstance(action, Substitution)
+    )
+    return tuple(teams), pending
+
+
+def _init_worker(simulator) -> None:
+    global _worker
+    # La copia llega con la pila y el journal del padre, no se necesitan
+    simulator.dispatch.checkpoint()
+    simulator.stack.clear()
+    simulator.depth = 0
+    # Los procesos solo simulan, no llevan estadísticas
+    simulator.game.headless = True
+    _worker = (simulator, GameEvaluator())
+
+
+def _rollout(task: RolloutTask) -> List[float]:
+    state, mask, descriptor, rollouts, seed, end = task
+    simulator, evaluator = _worker
+    game = simulator.game
+
+    game.rng.seed(seed)
+    # El estado llega empaquetado; entre simulaciones se deshace con el journal
+    unpack(game, state)
+    start = simulator.snapshot()
+
+    values = []
+    for _ in range(rollouts):
+        # Pasado el plazo las tareas pendientes terminan sin simular
+        if end is not None and time() >= end:
+            break
+        action = build(descriptor, game)
+        simulator.dispatch.dispatch(action)
+        simulator.simulate_rally(set(mask), heuristic_player=True)
+        values.append(evaluator.eval(game, action.team))
+        simulator.restore(start)
+    return values
+
+
+class RolloutPool:
+    """
+    Pool persistente de procesos para simular en paralelo las acciones
+    candidatas de la raíz. Cada proceso recibe una copia del simulador al
+    arrancar; después solo viajan el estado empaquetado y la descripción
+    de cada acción. Tras un cambio de jugadores los procesos se vuelven a
+    arrancar con la plantilla nueva. Con plazo, cada tarea devuelve solo
+    las simulaciones que terminaron a tiempo, quizá ninguna.
+    """
+
+    def __init__(self, simulator, workers: int) -> None:
+        self.simulator = simulator
+        self.workers: int = workers
+        self.method: str = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        self.roster: Hashable = None
+        self.pool = None
+        self.start()
+
+    def start(self) -> None:
+        self.roster = roster(self.simulator)
+        self.pool = mp.get_context(self.method).Pool(
+            self.workers, initializer=_init_worker, initargs=(self.simulator,)
+        )
+
+    def rollouts(
+        self,
+        game: Game,
+        actions: List[Action],
+        mask: Set[Tuple[int, str]],
+        rollouts: int,
+        deadline: Deadline | None = None,
+    ) -> List[List[float]]:
+        if roster(self.simulator) != self.roster:
+            self.close()
+            self.start()
+
+        # `perf_counter` no es comparable entre procesos, el plazo viaja en
+        # tiempo de reloj
+        end = time() + deadline.remaining_ms() / 1000 if deadline is not None else None
+        state = pack(game)
+        tasks = [
+            (state, mask, describe(action), rollouts, game.rng.getrandbits(32), end)
+            for action in actions
+        ]
+        chunksize = max(1, ceil(len(tasks) / (self.workers * 4)))
+        return self.pool.map(_rollout, tasks, chunksize)
+
+    def close(self) -> None:
+        self.pool.close()
+        self.pool.join()
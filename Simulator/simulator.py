@@ -1,55 +1,107 @@
-﻿from typing import Generator, List, Set, Tuple
+﻿from time import perf_counter
+from typing import Generator, List, Set, Tuple
 
-from prettytable import PrettyTable
-
-from Agents.actions import Dispatch, Move, Nothing
+from Agents.actions import Action, Dispatch, Move, Nothing, Snapshot
 from Agents.manager_action_strategy import (ActionSimulateStrategy)
 from Agents.manager_agent import Manager
+from Agents.player_agent import Player
 from Agents.simulator_agent import SimulatorAgent
 from Agents.team import TeamAgent
+from Simulator.markov import MarkovSimulator, win_table
+from Simulator.rollout_pool import RolloutPool
 from Tools.data import TeamData
 from Tools.enum import T1, T2
 from Tools.game import Game
+from Tools.timing import Deadline, LatencyTracker
 from Tools.utils import coin_toss
 
 CANT_RALLIES = 180
 INTERVAL_MANAGER = 1
 
+# Motores de simulación: agentes sobre el campo o cadena de toques de Markov
+AGENTS = "agents"
+MARKOV = "markov"
+ENGINES = (AGENTS, MARKOV)
+
 
 class VolleyballSimulation:
     def __init__(
-        self, team1: Tuple[TeamAgent, TeamData], team2: Tuple[TeamAgent, TeamData]
+        self,
+        team1: Tuple[TeamAgent, TeamData],
+        team2: Tuple[TeamAgent, TeamData],
+        checkpoint: bool = True,
+        decision_ms: float | None = None,
+        workers: int = 0,
+        seed: int | None = None,
+        engine: str = AGENTS,
     ) -> None:
+        if engine not in ENGINES:
+            raise Exception(f"Motor de simulación desconocido: {engine}")
 
         self.t1: TeamAgent = team1[0]
         self.t2: TeamAgent = team2[0]
-        self.game: Game = Game(team1[1], team2[1], CANT_RALLIES)
+        self.game: Game = Game(team1[1], team2[1], CANT_RALLIES, seed)
+        self.checkpoint: bool = checkpoint
+        self.decision_ms: float | None = decision_ms
+        self.workers: int = workers
+        self.latency: LatencyTracker = LatencyTracker()
+        self.engine: str = engine
+
+    def simulator(self) -> "Simulator | MarkovSimulator":
+        if self.engine == MARKOV:
+            return MarkovSimulator(self.t1, self.t2, self.game)
+        return Simulator(
+            self.t1, self.t2, self.game, self.decision_ms, self.latency, self.workers
+        )
+
+    def frame(self) -> str:
+        # El motor de Markov no usa el campo, solo se muestran las estadísticas
+        if self.engine == MARKOV:
+            return self.game_statistics()
+        return str(self.game.field) + "\n" + self.game_statistics()
 
     def simulate(self) -> Generator[str, None, None]:
-        simulator = Simulator(self.t1, self.t2, self.game)
+        simulator = self.simulator()
         simulator.start_match()
 
-        field_str = str(self.game.field)
-        statistics = self.game_statistics()
-
-        yield field_str + "\n" + statistics
+        yield self.frame()
 
         while not self.game.is_finish():
             simulator.simulate_rally(set([]))
-            field_str = str(self.game.field)
-            statistics = self.game_statistics()
-            yield field_str + "\n" + statistics
+            if self.checkpoint:
+                simulator.checkpoint()
+            yield self.frame()
+
+        simulator.close()
 
     def simulate_and_save(self):
-        simulator = Simulator(self.t1, self.t2, self.game)
+        simulator = self.simulator()
         simulator.start_match()
 
         while not self.game.is_finish():
             simulator.simulate_rally(set([]))
+            if self.checkpoint:
+                simulator.checkpoint()
 
+        simulator.close()
         return simulator.game.to_json()
 
+    def search_report(self) -> str:
+        # Las estrategias con búsqueda comparten su tabla entre los jugadores
+        lines = []
+        seen = set()
+        for team in (self.t1, self.t2):
+            for player in team.players.values():
+                table = getattr(player.strategy, "table", None)
+                if table is None or id(table) in seen:
+                    continue
+                seen.add(id(table))
+                name = player.strategy.__class__.__name__
+                lines.append(f"{team.name} ({name}): {table.report()}")
+        return "\n".join(lines)
+
     def game_statistics(self) -> str:
+        from prettytable import PrettyTable
 
         nh = self.t1.name
         na = self.t2.name
@@ -67,7 +119,15 @@ class VolleyballSimulation:
 
 
 class Simulator:
-    def __init__(self, team1: TeamAgent, team2: TeamAgent, game: Game) -> None:
+    def __init__(
+        self,
+        team1: TeamAgent,
+        team2: TeamAgent,
+        game: Game,
+        decision_ms: float | None = None,
+        latency: LatencyTracker | None = None,
+        workers: int = 0,
+    ) -> None:
         self.team1: TeamAgent = team1
         self.team2: TeamAgent = team2
         self.game: Game = game
@@ -75,28 +135,45 @@ class Simulator:
         self.dispatch = Dispatch(
             self.game
         )
+        self.depth: int = 0
+        # Tiempo máximo por decisión, None para no limitarla
+        self.decision_ms: float | None = decision_ms
+        self.latency: LatencyTracker = latency if latency is not None else LatencyTracker()
+        # Procesos para las simulaciones de la raíz, 0 para simular en serie
+        self.workers: int = workers
+        self.pool: RolloutPool | None = None
 
     def start_match(self):
         self.game.instance = 0
 
-        t1_lineup = self.team1.manager.get_line_up(SimulatorLineUpManager(self))
-        t2_lineup = self.team2.manager.get_line_up(SimulatorLineUpManager(self))
+        # Fuera del tiempo de las decisiones: las estrategias cargan sus
+        # tablas antes de que empiece el partido
+        for team in (self.team1, self.team2):
+            for player in team.players.values():
+                player.strategy.warm_up()
+
+        with self.game.lookahead():
+            t1_lineup = self.team1.manager.get_line_up(SimulatorLineUpManager(self))
+            t2_lineup = self.team2.manager.get_line_up(SimulatorLineUpManager(self))
 
         self.game.conf_line_ups(t1_lineup, t2_lineup)
+        self.game.win_table_builder = win_table
 
-        if coin_toss():
+        if coin_toss(self.game.rng):
             self.game.serving_team = T1
             self.game.ball_possession_team = T1
             ball_position = self.game.field.find_ball()
             ball_position = (ball_position.row, ball_position.col)
-            print("Sirve T1")
+            if not self.game.headless:
+                print("Sirve T1")
             self.game.field.move_ball(ball_position, (2, 2))
         else:
             self.game.serving_team = T2
             self.game.ball_possession_team = T2
             ball_position = self.game.field.find_ball()
             ball_position = (ball_position.row, ball_position.col)
-            print("Sirve T2")
+            if not self.game.headless:
+                print("Sirve T2")
             self.game.field.move_ball(ball_position, (17, 6))
 
         self.game.start_rally()
@@ -107,10 +184,11 @@ class Simulator:
         mask: Set[Tuple[int, str]],
         heuristic_player: bool = False,
     ):
+        self.depth += 1
         self.stack.append(len(self.dispatch.stack))
 
-        self.game.has_ball_landed = True
-        self.game.rally_over = False
+        self.game.journal.set(self.game, "has_ball_landed", True)
+        self.game.journal.set(self.game, "rally_over", False)
 
         current_team = self.game.ball_possession_team
         other_team = T1 if current_team == T2 else T2
@@ -134,7 +212,7 @@ class Simulator:
             sim = self.get_player_simulator(current_team, player, mask)
 
             player_action = (
-                current_team_players[player].play(sim)
+                self.play(current_team_players[player], sim)
                 if not heuristic_player
                 else current_team_players[player].play_heuristic(sim)
             )
@@ -148,7 +226,7 @@ class Simulator:
             sim = self.get_player_simulator(current_team, player, mask)
 
             player_action = (
-                other_team_players[player].play(sim)
+                self.play(other_team_players[player], sim)
                 if not heuristic_player
                 else other_team_players[player].play_heuristic(sim)
             )
@@ -192,9 +270,19 @@ class Simulator:
         elif self.game.rally_over:
             self.game.score_point(self.game.last_team_touched)
 
-        self.game.instance += 1
+        self.game.journal.add(self.game, "instance")
 
         self.simulate_managers(mask)
+        self.depth -= 1
+
+    def rollout(
+        self,
+        mask: Set[Tuple[int, str]],
+        heuristic_player: bool = False,
+    ):
+        # Cada jugada simulada con su propio flujo de azar
+        with self.game.rng_stream():
+            self.simulate_rally(mask, heuristic_player)
 
     def get_player_action(self, team: str, player_number: int, sim: SimulatorAgent):
         if team == T1:
@@ -207,15 +295,40 @@ class Simulator:
             if (T1, "manager") not in mask:
                 mask.add((T1, "manager"))
                 sim = self.get_simulator(self.team1.manager, T1, mask)
-                action = self.team1.manager.action(sim)
+                action = self.manager_action(self.team1.manager, sim)
                 self.dispatch.dispatch(action)
 
             if (T2, "manager") not in mask:
                 mask.add((T2, "manager"))
                 sim = self.get_simulator(self.team2.manager, T2, mask)
-                action = self.team2.manager.action(sim)
+                action = self.manager_action(self.team2.manager, sim)
                 self.dispatch.dispatch(action)
 
+    def deadline(self) -> Deadline | None:
+        return Deadline(self.decision_ms) if self.decision_ms is not None else None
+
+    def play(self, player: Player, sim: SimulatorAgent):
+        start = perf_counter()
+        with self.game.lookahead():
+            action = player.play(sim, self.deadline())
+        # Solo cuentan las decisiones reales, no las de simulaciones anidadas
+        if self.depth == 1:
+            self.latency.record(
+                player.strategy.__class__.__name__, (perf_counter() - start) * 1000
+            )
+        return action
+
+    def manager_action(self, manager: Manager, sim: SimulatorAgent):
+        start = perf_counter()
+        with self.game.lookahead():
+            action = manager.action(sim, self.deadline())
+        if self.depth == 1:
+            self.latency.record(
+                manager.action_strategy.__class__.__name__,
+                (perf_counter() - start) * 1000,
+            )
+        return action
+
     def get_simulator(self, manager: Manager, team: str, mask: Set[Tuple[int, str]]):
         if isinstance(manager.action_strategy, ActionSimulateStrategy):
             return SimulatorActionSimulateManager(self, team, mask)
@@ -224,6 +337,43 @@ class Simulator:
     def get_player_simulator(self, team: str, player: int, mask: Set[Tuple[int, str]]):
         return SimulatorActionSimulatePlayer(self, team, player, mask)
 
+    def checkpoint(self):
+        # Una jugada solo se compacta si ninguna simulación anidada puede deshacerla
+        if self.depth != 0:
+            return
+        self.dispatch.checkpoint()
+        self.stack.clear()
+
+    def can_parallelize(self) -> bool:
+        # Solo se reparten las decisiones reales, no las de simulaciones anidadas
+        return self.workers > 0 and self.depth == 1
+
+    def parallel_rollouts(
+        self,
+        actions: List[Action],
+        mask: Set[Tuple[int, str]],
+        rollouts: int,
+        deadline: Deadline | None = None,
+    ) -> List[List[float]] | None:
+        if not self.can_parallelize():
+            return None
+        if self.pool is None:
+            self.pool = RolloutPool(self, self.workers)
+        return self.pool.rollouts(self.game, actions, mask, rollouts, deadline)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
+    def snapshot(self) -> Tuple[Snapshot, int]:
+        return self.dispatch.snapshot(), len(self.stack)
+
+    def restore(self, snapshot: Tuple[Snapshot, int]):
+        dispatch_snapshot, stack_len = snapshot
+        self.dispatch.restore(dispatch_snapshot)
+        del self.stack[stack_len:]
+
     def reset_all(self):
         while self.game.instance != 1:
             self.reset_instance()
@@ -259,7 +409,7 @@ class SimulatorLineUpManager(SimulatorAgent):
 
     def simulate(self):
         while not self.game.is_finish():
-            self.simulator.simulate_rally(set())
+            self.simulator.rollout(set())
 
     def reset(self):
         self.simulator.reset_all()
@@ -282,10 +432,12 @@ class SimulatorActionSimulateManager(SimulatorAgent):
         self.instance: int = simulator.game.instance
         self.stack_len: int = len(simulator.dispatch.stack)
         self.mask: Set[Tuple[int, str]] = mask
+        self.start_state: Tuple[Snapshot, int] | None = None
 
     def simulate(self):
+        self.keep_start()
         while not self.simulator.game.is_finish():
-            self.simulator.simulate_rally(
+            self.simulator.rollout(
                 set([]), heuristic_player=True
             )
 
@@ -294,17 +446,25 @@ class SimulatorActionSimulateManager(SimulatorAgent):
             self.simulator.reset_instance()
 
     def simulate_current(self):
-        self.simulator.simulate_rally(
+        self.keep_start()
+        self.simulator.rollout(
             self.mask.copy(), heuristic_player=True
         )
 
     def reset_current(self):
-        while len(self.simulator.dispatch.stack) != self.stack_len:
-            self.simulator.dispatch.rollback()
+        self.keep_start()
+        self.simulator.restore(self.start_state)
 
     def dispatch(self) -> Dispatch:
+        self.keep_start()
         return self.simulator.dispatch
 
+    def keep_start(self):
+        # La marca de partida se toma la primera vez que algo puede cambiar
+        # el estado; las estrategias que no simulan no la necesitan
+        if self.start_state is None:
+            self.start_state = self.simulator.snapshot()
+
 
 class SimulatorActionSimulatePlayer(SimulatorAgent):
     def __init__(
@@ -317,9 +477,11 @@ class SimulatorActionSimulatePlayer(SimulatorAgent):
         self.instance: int = simulator.game.instance
         self.stack_len: int = len(simulator.dispatch.stack)
         self.mask: Set[Tuple[int, str]] = mask
+        self.start_state: Tuple[Snapshot, int] | None = None
 
     def simulate(self):
-        self.simulator.simulate_rally(
+        self.keep_start()
+        self.simulator.rollout(
             {(self.player, self.team)}, heuristic_player=True
         )
 
@@ -327,31 +489,49 @@ class SimulatorActionSimulatePlayer(SimulatorAgent):
         self.simulator.reset_instance()
 
     def simulate_current(self):
-        self.simulator.simulate_rally(
+        self.keep_start()
+        self.simulator.rollout(
             self.mask.copy(), heuristic_player=True
         )
 
     def reset_current(self):
-        while len(self.simulator.dispatch.stack) != self.stack_len:
-            self.simulator.dispatch.rollback()
+        self.keep_start()
+        self.simulator.restore(self.start_state)
+
+    def can_parallelize(self) -> bool:
+        return self.simulator.can_parallelize()
+
+    def parallel_rollouts(
+        self, actions: List[Action], rollouts: int, deadline: Deadline | None = None
+    ) -> List[List[float]] | None:
+        return self.simulator.parallel_rollouts(actions, self.mask, rollouts, deadline)
 
     def dispatch(self) -> Dispatch:
+        self.keep_start()
         return self.simulator.dispatch
 
+    def keep_start(self):
+        # La marca de partida se toma la primera vez que algo puede cambiar
+        # el estado; las estrategias que no simulan no la necesitan
+        if self.start_state is None:
+            self.start_state = self.simulator.snapshot()
+
 
 class SimulatorActionMiniMaxManager(SimulatorActionSimulateManager):
     def simulate(self):
+        self.keep_start()
         for _ in range(INTERVAL_MANAGER):
-            self.simulator.simulate_rally({(T1, "manager"), (T2, "manager")})
+            self.simulator.rollout({(T1, "manager"), (T2, "manager")})
 
     def reset(self):
         for _ in range(INTERVAL_MANAGER):
             self.simulator.reset_instance()
 
     def simulate_current(self):
+        self.keep_start()
         mask = self.mask.copy()
         if self.team == T1:
             mask.add((T2, "manager"))
         else:
             mask.add((T1, "manager"))
-        self.simulator.simulate_rally(mask)
+        self.simulator.rollout(mask)
@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Tools.enum import T1, T2
+from Tools.field import GridField
+
+
+class DecisionContext:
+    """
+    Hechos de equipo del estado actual del juego que comparten todos los
+    jugadores y comportamientos de una misma decisión. Se calculan la primera
+    vez que se piden; `Game.context` descarta el contexto cuando cambia la
+    versión del journal.
+    """
+
+    def __init__(self, game, version: Tuple[int, int]) -> None:
+        self.game = game
+        self.version: Tuple[int, int] = version
+        self._ball: Optional[GridField] = None
+        self._player_roles: Optional[Dict[Tuple[int, str], str]] = None
+        self._roles: Dict[str, Dict[str, List[GridField]]] = {}
+        self._opponents_near: Dict[str, np.ndarray] = {}
+        self._nearest_enemy: Dict[str, np.ndarray] = {}
+
+    @property
+    def ball(self) -> GridField:
+        if self._ball is None:
+            self._ball = self.game.field.find_ball()
+        return self._ball
+
+    def player_roles(self) -> Dict[Tuple[int, str], str]:
+        # Rol de cada jugador en el campo, indexado por (dorsal, equipo)
+        if self._player_roles is None:
+            self._player_roles = {
+                (player, team): data.get_player_role(player)
+                for team, data in ((T1, self.game.t1), (T2, self.game.t2))
+                for player in data.on_field
+            }
+        return self._player_roles
+
+    def role_grids(self, role: str, team: str) -> List[GridField]:
+        # Casillas de los jugadores del equipo con ese rol, en orden fila-columna
+        roles = self._roles.get(team)
+        if roles is None:
+            roles = self._roles[team] = {}
+            data = self.game.t1 if team == T1 else self.game.t2
+            for grid in self.game.team_grids(team):
+                roles.setdefault(data.get_player_role(grid.player), []).append(grid)
+        return roles.get(role, [])
+
+    def role_position(self, role: str, team: str) -> Optional[GridField]:
+        grids = self.role_grids(role, team)
+        return grids[0] if grids else None
+
+    def opponents_near(self, team: str) -> np.ndarray:
+        # Casillas del rival a distancia <= 2 de cada casilla del campo
+        if team not in self._opponents_near:
+            field = self.game.field
+            self._opponents_near[team] = field.opponents_within(
+                np.arange(len(field.cells)), team, 2
+            )
+        return self._opponents_near[team]
+
+    def nearest_enemy(self, team: str) -> np.ndarray:
+        # Distancia de cada casilla a la más cercana que no es del equipo
+        if team not in self._nearest_enemy:
+            field = self.game.field
+            self._nearest_enemy[team] = field.nearest_enemy(
+                np.arange(len(field.cells)), team
+            )
+        return self._nearest_enemy[team]
@@ -3,6 +3,10 @@
 T1 = "T1"
 T2 = "T2"
 
+# Dimensiones del campo en casillas
+ROWS = 19
+COLUMNS = 9
+
 
 class PlayerRole(Enum):
     SETTER = "S"
@@ -12,6 +16,20 @@ class PlayerRole(Enum):
     LIBERO = "L"
 
 
+def get_role_number(role):
+    if role == 'L':
+        return 0
+    if role == 'S':
+        return 1
+    if role == 'MB':
+        return 2
+    if role == 'OH':
+        return 3
+    if role == 'O':
+        return 4
+    return -1
+
+
 dict_t1 = {1: (2, 2), 2: (6, 2), 3: (7, 5), 4: (5, 7), 5: (1, 6), 6: (4, 4)}
 
 dict_t2 = {1: (17, 6), 2: (11, 7), 3: (10, 4), 4: (11, 1), 5: (17, 2), 6: (14, 4)}
@@ -1,8 +1,66 @@
 ﻿import math
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Set, Tuple
 
-from Tools.enum import T1, T2
+import numpy as np
+
+from Tools.enum import COLUMNS, ROWS, T1, T2
+from Tools.journal import Journal
 from Tools.line_up import LineUp
+from Tools.zobrist import cell_key
+
+NEIGHBOR_RADII = (2, 3)  # Radios de vecindad que se consultan durante la simulación
+TEAM_CODES: Dict[str, int] = {"": 0, T1: 1, T2: 2}  # Equipo de cada casilla en las capas
+
+
+def rotate_line_up(journal: Journal, team: str, line_up: LineUp) -> None:
+    # Guardar el line-up en el journal antes de rotarlo
+    journal.keep(line_up, "line_up")
+    for grid_info in line_up.line_up.values():
+        journal.keep(grid_info, "position_number")
+        journal.keep(grid_info, "row")
+        journal.keep(grid_info, "col")
+
+    # Rotar las posiciones en el line-up
+    line_up.rotate(team)
+
+
+class DistanceTables:
+    """
+    Distancias entre todas las casillas de un campo de tamaño fijo, indexadas
+    por `GridField.index`, y vecinos de cada casilla para los radios usados.
+    """
+
+    def __init__(self, rows: int, columns: int) -> None:
+        cells = [(r, c) for r in range(rows) for c in range(columns)]
+        self.euclidean: List[List[float]] = [
+            [math.sqrt((rs - rd) ** 2 + (cs - cd) ** 2) for rd, cd in cells]
+            for rs, cs in cells
+        ]
+        self.chebyshev: List[List[int]] = [
+            [max(abs(rs - rd), abs(cs - cd)) for rd, cd in cells] for rs, cs in cells
+        ]
+        self.neighbors: Dict[float, List[List[int]]] = {
+            radius: [
+                [index for index, d in enumerate(row) if d <= radius]
+                for row in self.euclidean
+            ]
+            for radius in NEIGHBOR_RADII
+        }
+        self.euclidean_array: np.ndarray = np.array(self.euclidean)
+        # Casillas de cada casilla de la más cercana a la más lejana
+        self.by_distance: List[List[int]] = [
+            sorted(range(len(cells)), key=row.__getitem__) for row in self.euclidean
+        ]
+
+
+_tables: Dict[Tuple[int, int], DistanceTables] = {}
+
+
+def distance_tables(rows: int, columns: int) -> DistanceTables:
+    tables = _tables.get((rows, columns))
+    if tables is None:
+        tables = _tables[(rows, columns)] = DistanceTables(rows, columns)
+    return tables
 
 
 class GridField:
@@ -23,6 +81,7 @@ class GridField:
         self.team: str = team
         self.is_net: bool = is_net
         self.position: int = position  # Posición de rotación (1-6)
+        self.index: int = 0  # Índice de la casilla en orden fila-columna
 
     def is_empty(self) -> bool:
         return self.player == -1
@@ -55,22 +114,104 @@ class GridField:
 
 
 class Field:
-    def __init__(self, rows: int = 19, columns: int = 9):
+    def __init__(
+        self, rows: int = ROWS, columns: int = COLUMNS, journal: Journal | None = None
+    ):
         self.rows = rows
         self.columns = columns
+        self.journal: Journal = journal if journal is not None else Journal()
         self.grid: List[List[GridField]] = [
             [GridField(r, c) for c in range(columns)] for r in range(rows)
         ]
         self.net_row = 9  # Fila de la red
         for c in range(columns):
             self.grid[self.net_row][c].is_net = True
+        self.cells: List[GridField] = [grid for row in self.grid for grid in row]
+        for index, grid in enumerate(self.cells):
+            grid.index = index
+        tables = distance_tables(rows, columns)
+        self.euclidean: List[List[float]] = tables.euclidean
+        self.chebyshev: List[List[int]] = tables.chebyshev
+        self.neighbors: Dict[float, List[List[int]]] = tables.neighbors
+        self.by_distance: List[List[int]] = tables.by_distance
+        self.euclidean_array: np.ndarray = tables.euclidean_array
+        # Capas del campo como arreglos, mantenidas junto a las casillas
+        size = rows * columns
+        self.teams: np.ndarray = np.zeros(size, dtype=np.int8)
+        self.players: np.ndarray = np.full(size, -1, dtype=np.int16)
+        self.positions: np.ndarray = np.zeros(size, dtype=np.int8)
+        self.balls: np.ndarray = np.zeros(size, dtype=bool)
+        self.hash: int = 0
+        # Índices de casillas; con varias candidatas gana la menor, como al recorrer el campo
+        self.ball_cells: Set[int] = set()
+        self.player_cells: Dict[Tuple[int, str], Set[int]] = {}
+        self.position_cells: Dict[Tuple[int, str], Set[int]] = {}
+
+    def update_grid(self, grid: GridField, attr: str, value) -> None:
+        # Todo cambio de una casilla pasa por el journal para poder deshacerlo
+        old = getattr(grid, attr)
+        if old != value:
+            self.journal.record(self._put, grid, attr, old)
+            self._put(grid, attr, value)
+
+    def _put(self, grid: GridField, attr: str, value) -> None:
+        # Actualiza el hash de Zobrist en O(1): sale el valor viejo, entra el nuevo
+        self.hash ^= cell_key(grid.row, grid.col, attr, getattr(grid, attr))
+        self.hash ^= cell_key(grid.row, grid.col, attr, value)
+        self._unindex(grid)
+        setattr(grid, attr, value)
+        self._index(grid)
+        self._layer(grid, attr)
+
+    def _layer(self, grid: GridField, attr: str) -> None:
+        if attr == "team":
+            self.teams[grid.index] = TEAM_CODES[grid.team]
+        elif attr == "player":
+            self.players[grid.index] = grid.player
+        elif attr == "position":
+            self.positions[grid.index] = grid.position
+        elif attr == "ball":
+            self.balls[grid.index] = grid.ball
+
+    def _index(self, grid: GridField) -> None:
+        if grid.ball:
+            self.ball_cells.add(grid.index)
+        if grid.player != -1:
+            self.player_cells.setdefault((grid.player, grid.team), set()).add(grid.index)
+        if grid.position != 0:
+            self.position_cells.setdefault((grid.position, grid.team), set()).add(grid.index)
+
+    def _unindex(self, grid: GridField) -> None:
+        if grid.ball:
+            self.ball_cells.discard(grid.index)
+        if grid.player != -1:
+            self.player_cells[(grid.player, grid.team)].discard(grid.index)
+        if grid.position != 0:
+            self.position_cells[(grid.position, grid.team)].discard(grid.index)
+
+    def rebuild(self) -> None:
+        # Recalcula hash e índices tras escribir las casillas directamente
+        self.journal.invalidate()
+        self.hash = 0
+        self.ball_cells.clear()
+        self.player_cells.clear()
+        self.position_cells.clear()
+        for grid in self.cells:
+            for attr in ("player", "team", "position", "ball"):
+                self.hash ^= cell_key(grid.row, grid.col, attr, getattr(grid, attr))
+            self._index(grid)
+        self.teams[:] = [TEAM_CODES[grid.team] for grid in self.cells]
+        self.players[:] = [grid.player for grid in self.cells]
+        self.positions[:] = [grid.position for grid in self.cells]
+        self.balls[:] = [grid.ball for grid in self.cells]
 
     def reset(self):
-        self.grid = [
-            [GridField(r, c) for c in range(self.columns)] for r in range(self.rows)
-        ]
-        for c in range(self.columns):
-            self.grid[self.net_row][c].is_net = True
+        for row in self.grid:
+            for grid in row:
+                self.update_grid(grid, "player", -1)
+                self.update_grid(grid, "ball", False)
+                self.update_grid(grid, "team", "")
+                self.update_grid(grid, "position", 0)
 
     def conf_line_ups(
         self, line_up_h: LineUp, line_up_a: LineUp, server_team: str | None = None
@@ -78,36 +219,36 @@ class Field:
         for grid in self.grid:
             for g in grid:
                 if g.row < 9:
-                    g.team = "T1"
+                    self.update_grid(g, "team", "T1")
                 elif g.row > 9:
-                    g.team = "T2"
-                g.player = -1
-                g.position = 0
-                g.ball = False
+                    self.update_grid(g, "team", "T2")
+                self.update_grid(g, "player", -1)
+                self.update_grid(g, "position", 0)
+                self.update_grid(g, "ball", False)
 
         for pos_number, grid_info in line_up_h.line_up.items():
             if pos_number == 1 and server_team == T1:
-                self.grid[grid_info.row][grid_info.col].ball = True
+                self.update_grid(self.grid[grid_info.row][grid_info.col], "ball", True)
             r, c, player_id = grid_info.row, grid_info.col, grid_info.player
-            self.grid[r][c].player = player_id
-            self.grid[r][c].team = T1
-            self.grid[r][c].position = pos_number
+            self.update_grid(self.grid[r][c], "player", player_id)
+            self.update_grid(self.grid[r][c], "team", T1)
+            self.update_grid(self.grid[r][c], "position", pos_number)
 
         for pos_number, grid_info in line_up_a.line_up.items():
             if pos_number == 1 and server_team == T2:
-                self.grid[grid_info.row][grid_info.col].ball = True
+                self.update_grid(self.grid[grid_info.row][grid_info.col], "ball", True)
             r, c, player_id = grid_info.row, grid_info.col, grid_info.player
-            self.grid[r][c].player = player_id
-            self.grid[r][c].team = T2
-            self.grid[r][c].position = pos_number  # Posición de rotación
+            self.update_grid(self.grid[r][c], "player", player_id)
+            self.update_grid(self.grid[r][c], "team", T2)
+            # Posición de rotación
+            self.update_grid(self.grid[r][c], "position", pos_number)
 
     def find_player_in_position(
         self, position_number: int, team: str
     ) -> Optional[GridField]:
-        for row in self.grid:
-            for grid in row:
-                if grid.team == team and grid.position == position_number:
-                    return grid
+        cells = self.position_cells.get((position_number, team))
+        if cells:
+            return self.cells[min(cells)]
         return None
 
     def move_ball(self, src: Tuple[int, int], dest: Tuple[int, int]) -> bool:
@@ -118,8 +259,8 @@ class Field:
             raise Exception("La pelota no está en la posición de origen")
 
         # Mover la pelota
-        self.grid[x_src][y_src].ball = False
-        self.grid[x_dest][y_dest].ball = True
+        self.update_grid(self.grid[x_src][y_src], "ball", False)
+        self.update_grid(self.grid[x_dest][y_dest], "ball", True)
 
         # Detectar si la pelota cruzó la red
         ball_crossed_net = (x_src < self.net_row <= x_dest) or (
@@ -132,25 +273,24 @@ class Field:
             return False
 
     def rotate_players(self, team: str, line_up_to_rotate: LineUp, line_up: LineUp):
-        # Rotar las posiciones en el line-up
-        line_up_to_rotate.rotate(team)
+        rotate_line_up(self.journal, team, line_up_to_rotate)
 
         # Limpiar las posiciones actuales en el campo
         for row in self.grid:
             for grid in row:
                 if grid.team == team:
-                    grid.player = -1
-                    grid.team = ""
-                    grid.position = 0
+                    self.update_grid(grid, "player", -1)
+                    self.update_grid(grid, "team", "")
+                    self.update_grid(grid, "position", 0)
 
         # Reubicar los jugadores en el campo según el line-up rotado
         for pos_number, grid_info in line_up_to_rotate.line_up.items():
             if pos_number == 1:
-                self.grid[grid_info.row][grid_info.col].ball = True
+                self.update_grid(self.grid[grid_info.row][grid_info.col], "ball", True)
             r, c, player_id = grid_info.row, grid_info.col, grid_info.player
-            self.grid[r][c].player = player_id
-            self.grid[r][c].team = team
-            self.grid[r][c].position = pos_number
+            self.update_grid(self.grid[r][c], "player", player_id)
+            self.update_grid(self.grid[r][c], "team", team)
+            self.update_grid(self.grid[r][c], "position", pos_number)
 
     def move_player(self, src: Tuple[int, int], dest: Tuple[int, int]):
         x_src, y_src = src
@@ -166,46 +306,75 @@ class Field:
             # raise Exception("La posición de destino ya está ocupada")
 
         # Actualizar posiciones
-        self.grid[x_dest][y_dest].player = player_field.player
-        self.grid[x_dest][y_dest].team = player_field.team
-        self.grid[x_dest][y_dest].position = player_field.position
+        dest_field = self.grid[x_dest][y_dest]
+        self.update_grid(dest_field, "player", player_field.player)
+        self.update_grid(dest_field, "team", player_field.team)
+        self.update_grid(dest_field, "position", player_field.position)
 
-        self.grid[x_src][y_src].player = -1
+        self.update_grid(player_field, "player", -1)
 
     def is_valid_grid(self, grid: Tuple[int, int]) -> bool:
         x, y = grid
         return 0 <= x < self.rows and 0 <= y < self.columns
 
-    @staticmethod
-    def distance(src: Tuple[int, int], dest: Tuple[int, int]) -> float:
-        xs, ys = src
-        xd, yd = dest
-        return math.sqrt((xs - xd) ** 2 + (ys - yd) ** 2)
+    def index_of(self, grid: Tuple[int, int]) -> int:
+        x, y = grid
+        return x * self.columns + y
+
+    def distance(self, src: Tuple[int, int], dest: Tuple[int, int]) -> float:
+        return self.euclidean[self.index_of(src)][self.index_of(dest)]
 
-    @staticmethod
-    def int_distance(src: Tuple[int, int], dest: Tuple[int, int]) -> int:
-        xs, ys = src
-        xd, yd = dest
-        return max(abs(xs - xd), abs(ys - yd))
+    def int_distance(self, src: Tuple[int, int], dest: Tuple[int, int]) -> int:
+        return self.chebyshev[self.index_of(src)][self.index_of(dest)]
 
     def find_player(self, dorsal: int, team: str) -> GridField:
-        for row in self.grid:
-            for grid in row:
-                if grid.player == dorsal and grid.team == team:
-                    return grid
+        cells = self.player_cells.get((dorsal, team))
+        if cells:
+            return self.cells[min(cells)]
         raise Exception(
             f"No se encontró al jugador con el dorsal {dorsal} del equipo {team} en el campo"
         )
 
     def find_ball(self) -> GridField:
-        for row in self.grid:
-            for grid in row:
-                if grid.ball:
-                    return grid
+        if self.ball_cells:
+            return self.cells[min(self.ball_cells)]
         raise Exception("La pelota no está en el campo")
 
+    def indices(self, grids: Sequence[Tuple[int, int]]) -> np.ndarray:
+        columns = self.columns
+        return np.fromiter((x * columns + y for x, y in grids), dtype=np.intp)
+
+    def opponents_within(
+        self, dests: np.ndarray, team: str, radius: float
+    ) -> np.ndarray:
+        # Casillas del rival a distancia <= radius de cada destino
+        opponent = self.teams == TEAM_CODES[T1 if team == T2 else T2]
+        return ((self.euclidean_array[dests] <= radius) & opponent).sum(axis=1)
+
+    def nearest_enemy(self, dests: np.ndarray, team: str) -> np.ndarray:
+        # Distancia de cada destino a la casilla más cercana que no es del equipo
+        enemy = self.teams != TEAM_CODES[team]
+        return np.where(enemy, self.euclidean_array[dests], np.inf).min(axis=1)
+
+    def empty_ring(
+        self, src: int, team: str, inner: float, outer: float
+    ) -> np.ndarray:
+        # Casillas vacías del equipo con inner < distancia <= outer desde src
+        distances = self.euclidean_array[src]
+        return np.flatnonzero(
+            (inner < distances)
+            & (distances <= outer)
+            & (self.players == -1)
+            & (self.teams == TEAM_CODES[team])
+        )
+
     def neighbor_grids(self, src: GridField, max_distance: float) -> List[GridField]:
         x, y = (src.row, src.col)
+        if max_distance in self.neighbors:
+            return [
+                self.cells[index]
+                for index in self.neighbors[max_distance][self.index_of((x, y))]
+            ]
         grids: List[GridField] = []
         for row in self.grid:
             for grid in row:
@@ -229,8 +398,11 @@ class Field:
         return field_str
 
     def update_player_on_field(self, player_in: int, player_out: int):
-        for grid in self.grid:
-            for g in grid:
-                if g.player == player_out:
-                    g.player = player_in
-                    return
+        cells = [
+            index
+            for (player, _), team_cells in self.player_cells.items()
+            if player == player_out
+            for index in team_cells
+        ]
+        if cells:
+            self.update_grid(self.cells[min(cells)], "player", player_in)
@@ -1,20 +1,30 @@
-from typing import Tuple
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Tuple
 
 from Tools.data import TeamData
+from Tools.decision_context import DecisionContext
 from Tools.enum import T1, T2
-from Tools.field import Field, GridField
+from Tools.field import Field, GridField, rotate_line_up
+from Tools.journal import Journal
 from Tools.line_up import LineUp
+from Tools.rng import BlockRandom
 from Tools.utils import coin_toss
+from Tools.win_probability import WinProbabilityTable
+from Tools.zobrist import zobrist_key
 
 
 class Game:
 
-    def __init__(self, t1: TeamData, t2: TeamData, cant_instances: int):
+    def __init__(
+        self, t1: TeamData, t2: TeamData, cant_instances: int, seed: int | None = None
+    ):
         self.last_team_touched: str | None = None
         self.last_player_touched: int | None = None
         self.instance = 0
         self.cant_instances: int = cant_instances
-        self.field: Field = Field()
+        self.journal: Journal = Journal()
+        self._context: DecisionContext | None = None
+        self.field: Field = Field(journal=self.journal)
         self.t1: TeamData = t1
         self.t2: TeamData = t2
         self.t1_score = 0
@@ -32,55 +42,129 @@ class Game:
         self.rally_over = False
         self.has_ball_landed = False
         self.points_history = []
+        # Sin estadísticas ni mensajes; el historial y los errores sí, los usan los mánagers
+        self.headless: bool = False
+        # Todo el azar del partido sale de este generador
+        self.rng: BlockRandom = BlockRandom(seed)
+        # Sin campo solo se llevan el marcador y las rotaciones de los line-ups
+        self.use_field: bool = True
+        # Construye la tabla de probabilidad de victoria desde cada marcador
+        # para los jugadores en el campo; sin ella no hay tabla
+        self.win_table_builder: Callable[["Game"], WinProbabilityTable] | None = None
+        # Solo la tabla de los jugadores actuales: las anteriores las guarda,
+        # acotada, la caché del constructor
+        self._win_table: Tuple[Tuple, WinProbabilityTable | None] = ((), None)
+
+    @property
+    def win_table(self) -> WinProbabilityTable | None:
+        # Una tabla por jugadores en el campo: tras un cambio se calcula otra
+        if self.win_table_builder is None:
+            return None
+        key = tuple(
+            tuple(sorted((grid.slot, grid.player) for grid in team.line_up.line_up.values()))
+            for team in (self.t1, self.t2)
+        )
+        if self._win_table[0] != key:
+            self._win_table = (key, self.win_table_builder(self))
+        return self._win_table[1]
+
+    @contextmanager
+    def lookahead(self) -> Iterator[None]:
+        # Las simulaciones anticipadas no llevan la contabilidad del partido real
+        headless = self.headless
+        self.headless = True
+        try:
+            with self.rng_stream():
+                yield
+        finally:
+            self.headless = headless
+
+    @contextmanager
+    def rng_stream(self) -> Iterator[None]:
+        # Un generador propio derivado del actual: lo que se simule dentro
+        # del bloque no cambia los números que saca el flujo de fuera
+        rng = self.rng
+        self.rng = rng.spawn()
+        try:
+            yield
+        finally:
+            self.rng = rng
 
     def score_point(self, scorer_team: str):
-        self.ball_possession_team = scorer_team
+        journal = self.journal
+        journal.set(self, "ball_possession_team", scorer_team)
         if scorer_team == T1:
-            if self.last_player_touched in self.t1.on_field:
+            if self.last_player_touched in self.t1.on_field and not self.headless:
                 player_statics = self.t1.players_statistics[self.last_player_touched]
-                player_statics.points += 1
+                journal.add(player_statics, "points")
                 if self.general_touches <= 1:
-                    player_statics.aces += 1
-            self.t1_score += 1
-            if self.t1_score == 25:
+                    journal.add(player_statics, "aces")
+            journal.add(self, "t1_score")
+            if self.t1_score == 25 and not self.headless:
                 team_statics = self.t1.statistics
-                team_statics.sets += 1
-            self.points_history.append(
-                {"team": T1, "score": self.t1_score, "set": self.current_set}
+                journal.add(team_statics, "sets")
+            journal.append(
+                self.points_history,
+                {"team": T1, "score": self.t1_score, "set": self.current_set},
             )
         else:
-            if self.last_player_touched in self.t2.on_field:
+            if self.last_player_touched in self.t2.on_field and not self.headless:
                 player_statics = self.t2.players_statistics[self.last_player_touched]
-                player_statics.points += 1
+                journal.add(player_statics, "points")
                 if self.general_touches <= 1:
-                    player_statics.aces += 1
-            self.t2_score += 1
-            if self.t2_score == 25:
+                    journal.add(player_statics, "aces")
+            journal.add(self, "t2_score")
+            if self.t2_score == 25 and not self.headless:
                 team_statics = self.t2.statistics
-                team_statics.sets += 1
-            self.points_history.append(
-                {"team": T2, "score": self.t2_score, "set": self.current_set}
+                journal.add(team_statics, "sets")
+            journal.append(
+                self.points_history,
+                {"team": T2, "score": self.t2_score, "set": self.current_set},
             )
 
         if self.serving_team != scorer_team:
-            self.serving_team = scorer_team
-            if scorer_team == T1:
-                self.field.rotate_players(scorer_team, self.t1.line_up, self.t2.line_up)
-            else:
-                self.field.rotate_players(scorer_team, self.t2.line_up, self.t1.line_up)
+            journal.set(self, "serving_team", scorer_team)
+            self.rotate(scorer_team)
 
-        self.touches[T1] = 0
-        self.touches[T2] = 0
-        self.general_touches = 0
-        self.last_team_touched = None
+        journal.set_item(self.touches, T1, 0)
+        journal.set_item(self.touches, T2, 0)
+        journal.set(self, "general_touches", 0)
+        journal.set(self, "last_team_touched", None)
 
         if self.has_set_ended():
             self.end_set()
-        else:
+        elif self.use_field:
             self.field.conf_line_ups(
                 self.t1.line_up, self.t2.line_up, self.serving_team
             )
 
+    def rotate(self, team: str):
+        rotating = self.t1.line_up if team == T1 else self.t2.line_up
+        if self.use_field:
+            other = self.t2.line_up if team == T1 else self.t1.line_up
+            self.field.rotate_players(team, rotating, other)
+        else:
+            rotate_line_up(self.journal, team, rotating)
+
+    def hash(self) -> int:
+        # El campo mantiene su parte del hash al vuelo, el resto son pocos escalares
+        return (
+            self.field.hash
+            ^ zobrist_key("t1_score", self.t1_score)
+            ^ zobrist_key("t2_score", self.t2_score)
+            ^ zobrist_key("t1_sets", self.t1_sets)
+            ^ zobrist_key("t2_sets", self.t2_sets)
+            ^ zobrist_key("t1_touches", self.touches[T1])
+            ^ zobrist_key("t2_touches", self.touches[T2])
+            ^ zobrist_key("general_touches", self.general_touches)
+            ^ zobrist_key("last_player_touched", self.last_player_touched)
+            ^ zobrist_key("last_team_touched", self.last_team_touched)
+            ^ zobrist_key("serving_team", self.serving_team)
+            ^ zobrist_key("ball_possession_team", self.ball_possession_team)
+            ^ zobrist_key("rally_over", self.rally_over)
+            ^ zobrist_key("has_ball_landed", self.has_ball_landed)
+        )
+
     def has_set_ended(self) -> bool:
         if (
                 self.t1_score >= self.points_to_win_set
@@ -90,31 +174,38 @@ class Game:
         return False
 
     def end_set(self):
+        journal = self.journal
         if self.t1_score > self.t2_score:
-            self.t1_sets += 1
+            journal.add(self, "t1_sets")
         else:
-            self.t2_sets += 1
+            journal.add(self, "t2_sets")
 
-        self.t1_score = 0
-        self.t2_score = 0
-        self.current_set += 1
+        journal.set(self, "t1_score", 0)
+        journal.set(self, "t2_score", 0)
+        journal.add(self, "current_set")
 
         if self.t1_sets == self.sets_to_win or self.t2_sets == self.sets_to_win:
             self.end_match()
         else:
-            self.field.reset()
+            if self.use_field:
+                self.field.reset()
             if self.current_set == 5:
-                self.serving_team = T1 if coin_toss() else T2
+                journal.set(self, "serving_team", T1 if coin_toss(self.rng) else T2)
             else:
-                self.serving_team = T1 if self.current_set % 2 == 1 else T2
+                journal.set(
+                    self, "serving_team", T1 if self.current_set % 2 == 1 else T2
+                )
 
-            self.field.conf_line_ups(
-                self.t1.line_up,
-                self.t2.line_up,
-                "T2" if self.serving_team == T1 else "T1",
-            )
+            if self.use_field:
+                self.field.conf_line_ups(
+                    self.t1.line_up,
+                    self.t2.line_up,
+                    "T2" if self.serving_team == T1 else "T1",
+                )
 
     def end_match(self):
+        if self.headless:
+            return
         if self.t1_sets > self.t2_sets:
             print("El equipo 1 ha ganado el partido")
         else:
@@ -139,7 +230,8 @@ class Game:
     def conf_line_ups(self, line_up_h: LineUp, line_up_a: LineUp):
         self.t1.line_up = line_up_h
         self.t2.line_up = line_up_a
-        self.field.conf_line_ups(line_up_h, line_up_a, self.serving_team)
+        if self.use_field:
+            self.field.conf_line_ups(line_up_h, line_up_a, self.serving_team)
 
         self.t1.on_field = set([p.player for p in line_up_h.line_up.values()])
         self.t2.on_field = set([p.player for p in line_up_a.line_up.values()])
@@ -151,9 +243,11 @@ class Game:
             [p for p in self.t2.data.keys() if p not in self.t2.on_field]
         )
 
+        if not self.use_field:
+            return
         serving_grid = self.field.find_player_in_position(1, self.serving_team)
         if serving_grid:
-            serving_grid.ball = True
+            self.field.update_grid(serving_grid, "ball", True)
         else:
             raise Exception("No se encontró el jugador que sirve")
 
@@ -216,10 +310,12 @@ class Game:
         return (ball_grid.row, ball_grid.col)
 
     def start_rally(self):
-        self.touches = {T1: 0, T2: 0}
-        self.last_team_touched = None
-        self.ball_possession_team = self.serving_team
-        self.rally_over = False
+        journal = self.journal
+        journal.set_item(self.touches, T1, 0)
+        journal.set_item(self.touches, T2, 0)
+        journal.set(self, "last_team_touched", None)
+        journal.set(self, "ball_possession_team", self.serving_team)
+        journal.set(self, "rally_over", False)
 
     def is_rally_over(self) -> bool:
         return self.rally_over
@@ -261,49 +357,41 @@ class Game:
     def role_position(
             self, role: str, team: str, destination: Tuple[int, int] = (0, 0)
     ) -> GridField:
-        min_distance = float("inf")
-        role_position = None
-        counter = 0
-        if role == "OH":
-            for row in self.field.grid:
-                for grid in row:
-                    if grid.player != -1 and grid.team == team:
-                        player_role = (
-                            self.t1.get_player_role(grid.player)
-                            if team == T1
-                            else self.t2.get_player_role(grid.player)
-                        )
-                        if player_role == role:
-                            counter += 1
-                            distance = self.field.distance(
-                                destination, (grid.row, grid.col)
-                            )
-                            if distance < min_distance:
-                                min_distance = distance
-                                role_position = grid
-                            if counter == 2:
-                                return role_position
-
-        for row in self.field.grid:
-            for grid in row:
-                if grid.player != -1 and grid.team == team:
-                    player_role = (
-                        self.t1.get_player_role(grid.player)
-                        if team == T1
-                        else self.t2.get_player_role(grid.player)
-                    )
-                    if player_role == role:
-                        return grid
+        grids = self.role_grids(role, team)
+        if role == "OH" and len(grids) >= 2:
+            # De los dos primeros OH, el más cercano al destino
+            return min(
+                grids[:2],
+                key=lambda grid: self.field.distance(destination, (grid.row, grid.col)),
+            )
+        return grids[0] if grids else None
+
+    def team_grids(self, team: str) -> List[GridField]:
+        # Casillas con jugadores del equipo, en orden fila-columna
+        cells = sorted(
+            index
+            for (_, cell_team), team_cells in self.field.player_cells.items()
+            if cell_team == team
+            for index in team_cells
+        )
+        return [self.field.cells[index] for index in cells]
+
+    def role_grids(self, role: str, team: str) -> List[GridField]:
+        return self.context().role_grids(role, team)
+
+    def context(self) -> DecisionContext:
+        version = self.journal.version()
+        if self._context is None or self._context.version != version:
+            self._context = DecisionContext(self, version)
+        return self._context
 
     def closest_enemy_distance(self, src: Tuple[int, int], team: str) -> float:
-        min_distance = float("inf")
-        for row in self.field.grid:
-            for grid in row:
-                if grid.team != team:
-                    distance = self.field.distance(src, (grid.row, grid.col))
-                    if distance < min_distance:
-                        min_distance = distance
-        return min_distance
+        # Se recorren las casillas de la más cercana a la más lejana
+        src_index = self.field.index_of(src)
+        for index in self.field.by_distance[src_index]:
+            if self.field.cells[index].team != team:
+                return self.field.euclidean[src_index][index]
+        return float("inf")
 
     def can_call_time_out(self, team: str) -> bool:
         return self.t1.time_outs > 0 if team == T1 else self.t2.time_outs > 0
@@ -0,0 +1,101 @@
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Módulos de entrada de las simulaciones; `main` no se incluye porque
+# importarlo ya lanza un partido
+ENTRY_MODULES = [
+    "starting_params",
+    "Simulator.build_data",
+    "Simulator.simulator",
+    "Agents.player_strategy",
+]
+
+# Tiempo acumulado de importación de cada entrada en ms, medido con 1 núcleo
+IMPORT_BASELINE_MS = {
+    "starting_params": 140,
+    "Simulator.build_data": 150,
+    "Simulator.simulator": 150,
+    "Agents.player_strategy": 145,
+}
+# Una entrada es una regresión si tarda más que la línea base por este factor
+IMPORT_TOLERANCE = 2.0
+# Paquetes pesados que solo se cargan en la primera evaluación
+LAZY_MODULES = ["skfuzzy"]
+
+
+def import_times(module: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Importa el módulo en un proceso nuevo con `-X importtime` y devuelve el
+    tiempo propio y acumulado en microsegundos de cada módulo cargado.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"No se pudo importar {module}: {result.stderr.strip()}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def loaded_modules(module: str) -> List[str]:
+    # Módulos en `sys.modules` tras importar la entrada en un proceso nuevo
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sorted(sys.modules))"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise Exception(f"No se pudo importar {module}: {result.stderr.strip()}")
+    return result.stdout.split()
+
+
+def report(modules: List[str], top: int = 10) -> str:
+    from prettytable import PrettyTable
+
+    table = PrettyTable()
+    table.field_names = ["Entrada", "Módulo", "Propio (ms)", "Acumulado (ms)"]
+    for module in modules:
+        # Los módulos más lentos por tiempo acumulado, empezando por la entrada
+        times = import_times(module)
+        slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+        for i, (name, (own, cumulative)) in enumerate(slowest[:top]):
+            entry = module if i == 0 else ""
+            table.add_row([entry, name, f"{own / 1000:.1f}", f"{cumulative / 1000:.1f}"])
+    return table.get_string()
+
+
+def check(modules: List[str], tolerance: float = IMPORT_TOLERANCE) -> List[str]:
+    """
+    Devuelve las regresiones de las entradas respecto a `IMPORT_BASELINE_MS`
+    y los módulos de `LAZY_MODULES` que se cargan al importarlas.
+    """
+    regressions = []
+    for module in modules:
+        times = import_times(module)
+        cumulative = times[module][1] / 1000
+        limit = IMPORT_BASELINE_MS[module] * tolerance
+        if cumulative > limit:
+            regressions.append(f"{module}: {cumulative:.1f} ms > {limit:.1f} ms")
+        for lazy in LAZY_MODULES:
+            if lazy in times:
+                regressions.append(f"{module}: importa {lazy}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--check"]:
+        regressions = check(sys.argv[2:] or ENTRY_MODULES)
+        print("\n".join(regressions) or "Sin regresiones")
+        sys.exit(1 if regressions else 0)
+    print(report(sys.argv[1:] or ENTRY_MODULES))
@@ -0,0 +1,66 @@
+from operator import setitem
+from typing import Any, Callable, List, Tuple
+
+
+def _pop(target: list, _key: Any, _old: Any) -> None:
+    target.pop()
+
+
+class Journal:
+    """
+    Registro de deshacer: cada cambio guarda solo el valor anterior del campo
+    que modifica, y `undo` los repite en orden inverso hasta una marca.
+    """
+
+    def __init__(self) -> None:
+        self.entries: List[Tuple[Callable[[Any, Any, Any], None], Any, Any, Any]] = []
+        # Cambia cada vez que las entradas dejan de crecer desde la última versión
+        self.generation: int = 0
+
+    def mark(self) -> int:
+        return len(self.entries)
+
+    def version(self) -> Tuple[int, int]:
+        # Dentro de una generación las entradas solo crecen, así que el par
+        # identifica un único estado
+        return len(self.entries), self.generation
+
+    def invalidate(self) -> None:
+        # El estado cambió sin pasar por el journal
+        self.generation += 1
+
+    def record(
+        self, undo: Callable[[Any, Any, Any], None], target: Any, key: Any, old: Any
+    ) -> None:
+        self.entries.append((undo, target, key, old))
+
+    def keep(self, target: Any, name: str) -> None:
+        self.entries.append((setattr, target, name, getattr(target, name)))
+
+    def set(self, target: Any, name: str, value: Any) -> None:
+        self.entries.append((setattr, target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def add(self, target: Any, name: str, delta: int = 1) -> None:
+        old = getattr(target, name)
+        self.entries.append((setattr, target, name, old))
+        setattr(target, name, old + delta)
+
+    def set_item(self, target: dict, key: Any, value: Any) -> None:
+        self.entries.append((setitem, target, key, target[key]))
+        target[key] = value
+
+    def append(self, target: list, value: Any) -> None:
+        self.entries.append((_pop, target, None, None))
+        target.append(value)
+
+    def undo(self, mark: int) -> None:
+        self.generation += 1
+        entries = self.entries
+        while len(entries) > mark:
+            undo, target, key, old = entries.pop()
+            undo(target, key, old)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self.entries.clear()
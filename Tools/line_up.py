@@ -15,6 +15,7 @@ class LineUpGrid:
             None
         )
         self.position_number: int = position_number
+        self.slot: int = position_number  # Posición inicial, no cambia al rotar
         self.conf: str = "NORMAL"
         self.player_role: str = player_role
 
@@ -0,0 +1,198 @@
+from array import array
+from typing import Dict
+
+from Tools.data import TeamData
+from Tools.enum import T1, T2
+from Tools.game import Game
+from Tools.line_up import LineUpGrid
+
+TEAM_CODES = {None: 0, "": 0, T1: 1, T2: 2}
+TEAM_NAMES = ["", T1, T2]
+
+PLAYER_COUNTERS = (
+    "points",
+    "attacks",
+    "errors",
+    "blocks",
+    "aces",
+    "digs",
+    "receives",
+    "serves",
+    "sets",
+    "total_attacks",
+    "total_blocks",
+    "total_aces",
+    "total_digs",
+    "total_receives",
+    "total_serves",
+    "total_sets",
+    "total_points",
+)
+
+TEAM_COUNTERS = (
+    "points",
+    "aces",
+    "errors",
+    "blocks",
+    "digs",
+    "attacks",
+    "substitutions",
+    "serves",
+    "sets_won",
+    "sets_lost",
+    "receives",
+    "sets",
+)
+
+HEADER_SIZE = 18
+
+
+def pack(game: Game) -> array:
+    """
+    Codifica el estado mutable del partido en un único buffer de enteros:
+    cabecera con marcador y toques, una celda por casilla del campo y, por
+    equipo, line-up, jugadores en cancha, en banca y no disponibles, cambios
+    hechos y contadores de estadísticas. El historial de puntos solo crece
+    por el final, así que de él se guarda su longitud.
+    """
+    state = array(
+        "i",
+        [
+            game.instance,
+            game.t1_score,
+            game.t2_score,
+            game.t1_sets,
+            game.t2_sets,
+            game.current_set,
+            TEAM_CODES[game.serving_team],
+            TEAM_CODES[game.ball_possession_team],
+            TEAM_CODES[game.last_team_touched],
+            -1 if game.last_player_touched is None else game.last_player_touched,
+            game.touches[T1],
+            game.touches[T2],
+            game.general_touches,
+            game.rally_over,
+            game.has_ball_landed,
+            game.t1.time_outs,
+            game.t2.time_outs,
+            len(game.points_history),
+        ],
+    )
+
+    state.extend(
+        (grid.player + 1) << 8
+        | TEAM_CODES[grid.team] << 4
+        | grid.position << 1
+        | grid.ball
+        for row in game.field.grid
+        for grid in row
+    )
+
+    _pack_team(state, game.t1)
+    _pack_team(state, game.t2)
+    return state
+
+
+def _pack_team(state: array, team: TeamData) -> None:
+    # Se respeta el orden del diccionario, `LineUp.rotate` depende de él
+    for grid in team.line_up.line_up.values():
+        state.extend((grid.slot, grid.position_number, grid.row, grid.col, grid.player))
+
+    on_field = list(team.on_field)
+    state.extend(on_field + [-1] * (6 - len(on_field)))
+
+    # Banca, no disponibles y cambios cambian de tamaño, van con su longitud
+    for players in (team.on_bench, team.unavailable):
+        state.append(len(players))
+        state.extend(players)
+    state.append(len(team.substitution_history))
+    for player_out, player_in in team.substitution_history:
+        state.extend((player_out, player_in))
+
+    for dorsal, data in team.data.items():
+        state.append(data.errors)
+        statistics = team.players_statistics[dorsal]
+        state.extend(getattr(statistics, name) for name in PLAYER_COUNTERS)
+    state.extend(getattr(team.statistics, name) for name in TEAM_COUNTERS)
+
+
+def unpack(game: Game, state: array) -> None:
+    """
+    Restaura en el mismo grafo de objetos un estado producido por `pack`.
+    """
+    (
+        game.instance,
+        game.t1_score,
+        game.t2_score,
+        game.t1_sets,
+        game.t2_sets,
+        game.current_set,
+        serving_team,
+        ball_possession_team,
+        last_team_touched,
+        last_player_touched,
+        game.touches[T1],
+        game.touches[T2],
+        game.general_touches,
+        rally_over,
+        has_ball_landed,
+        game.t1.time_outs,
+        game.t2.time_outs,
+        points_len,
+    ) = state[:HEADER_SIZE]
+    game.serving_team = TEAM_NAMES[serving_team]
+    game.ball_possession_team = TEAM_NAMES[ball_possession_team]
+    game.last_team_touched = TEAM_NAMES[last_team_touched] or None
+    game.last_player_touched = None if last_player_touched == -1 else last_player_touched
+    game.rally_over = bool(rally_over)
+    game.has_ball_landed = bool(has_ball_landed)
+    del game.points_history[points_len:]
+
+    index = HEADER_SIZE
+    for row in game.field.grid:
+        for grid in row:
+            value = state[index]
+            grid.player = (value >> 8) - 1
+            grid.team = TEAM_NAMES[value >> 4 & 0xF]
+            grid.position = value >> 1 & 0x7
+            grid.ball = bool(value & 1)
+            index += 1
+    game.field.rebuild()
+
+    index = _unpack_team(state, index, game.t1)
+    _unpack_team(state, index, game.t2)
+
+
+def _unpack_team(state: array, index: int, team: TeamData) -> int:
+    slots = {grid.slot: grid for grid in team.line_up.line_up.values()}
+    line_up: Dict[int, LineUpGrid] = {}
+    for _ in range(6):
+        grid = slots[state[index]]
+        grid.position_number, grid.row, grid.col, grid.player = state[index + 1:index + 5]
+        line_up[grid.position_number] = grid
+        index += 5
+    team.line_up.line_up = line_up
+
+    team.on_field.clear()
+    team.on_field.update(dorsal for dorsal in state[index:index + 6] if dorsal != -1)
+    index += 6
+
+    for players in (team.on_bench, team.unavailable):
+        size = state[index]
+        players.clear()
+        players.update(state[index + 1:index + 1 + size])
+        index += 1 + size
+    size = state[index]
+    pairs = state[index + 1:index + 1 + 2 * size]
+    team.substitution_history[:] = list(zip(pairs[::2], pairs[1::2]))
+    index += 1 + 2 * size
+
+    for dorsal, data in team.data.items():
+        data.errors = state[index]
+        statistics = team.players_statistics[dorsal]
+        for name, value in zip(PLAYER_COUNTERS, state[index + 1:index + 18]):
+            setattr(statistics, name, value)
+        index += 18
+    for name, value in zip(TEAM_COUNTERS, state[index:index + len(TEAM_COUNTERS)]):
+        setattr(team.statistics, name, value)
+    return index + len(TEAM_COUNTERS)
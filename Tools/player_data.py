@@ -1,10 +1,11 @@
-﻿from typing import List
+﻿from typing import TYPE_CHECKING, List
 
-from pandas import DataFrame
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 
 class PlayerData:
-    def __init__(self, df: DataFrame):
+    def __init__(self, df: "DataFrame"):
         self.name: str = df["Name"]
         self.position: str = df["Position"]
         self.p_attack: int = self._set_int_value(df["p_Attack"])
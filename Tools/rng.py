@@ -0,0 +1,88 @@
+from typing import List, Sequence, TypeVar
+
+import numpy as np
+
+# Números que se piden de una vez al generador de numpy
+BLOCK_SIZE = 256
+
+T = TypeVar("T")
+
+
+class BlockRandom:
+    """
+    Generador con la parte de la interfaz de `random.Random` que usa el
+    juego. Los números salen por bloques de un `numpy.random.Generator`:
+    `random` lee el siguiente del bloque y `randoms` entrega varios
+    seguidos como un trozo del arreglo, los mismos que darían otras tantas
+    llamadas a `random`.
+    """
+
+    def __init__(self, seed: int | None = None, block: int = BLOCK_SIZE) -> None:
+        self.block: int = block
+        self.seed(seed)
+
+    def seed(self, seed: int | None = None) -> None:
+        # El generador de numpy se crea con el primer bloque que haga falta
+        self._seed: int | None = seed
+        self.generator: np.random.Generator | None = None
+        self._set_block(np.zeros(0))
+
+    def _numpy(self) -> np.random.Generator:
+        if self.generator is None:
+            self.generator = np.random.Generator(np.random.PCG64(self._seed))
+        return self.generator
+
+    def _set_block(self, array: np.ndarray) -> None:
+        # Los trozos que devuelve randoms son vistas de este arreglo
+        array.flags.writeable = False
+        self._array: np.ndarray = array
+        self._values: List[float] = array.tolist()
+        self._next: int = 0
+
+    def _refill(self) -> None:
+        self._set_block(self._numpy().random(self.block))
+
+    def random(self) -> float:
+        if self._next == len(self._values):
+            self._refill()
+        value = self._values[self._next]
+        self._next += 1
+        return value
+
+    def randoms(self, n: int) -> np.ndarray:
+        start = self._next
+        if start + n <= len(self._array):
+            self._next = start + n
+            return self._array[start:start + n]
+
+        parts = [self._array[start:]]
+        n -= len(parts[0])
+        while n > 0:
+            self._refill()
+            self._next = min(n, len(self._array))
+            parts.append(self._array[:self._next])
+            n -= self._next
+        return np.concatenate(parts)
+
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq: Sequence[T]) -> T:
+        return seq[int(self.random() * len(seq))]
+
+    def getrandbits(self, k: int) -> int:
+        raw = self._numpy().bit_generator.random_raw
+        bits = 0
+        for _ in range((k + 63) // 64):
+            bits = (bits << 64) | int(raw())
+        return bits >> (-k % 64)
+
+    def spawn(self) -> "BlockRandom":
+        # Un flujo independiente: su primer bloque sale de este generador y
+        # solo crea el suyo propio si lo agota
+        child = BlockRandom.__new__(BlockRandom)
+        child.block = self.block
+        child._seed = self.getrandbits(64)
+        child.generator = None
+        child._set_block(self._numpy().random(self.block))
+        return child
@@ -0,0 +1,76 @@
+import math
+from time import perf_counter
+from typing import Dict, List
+
+
+class Deadline:
+    """
+    Instante límite para tomar una decisión, medido con `perf_counter`.
+    Las estrategias consultan `expired` entre unidades de trabajo (una
+    simulación, una iteración); el mayor intervalo entre consultas se usa
+    como estimación de lo que cuesta la siguiente.
+    """
+
+    def __init__(self, budget_ms: float) -> None:
+        self.budget_ms: float = budget_ms
+        self.last: float = perf_counter()
+        self.end: float = self.last + budget_ms / 1000
+        self.unit: float = 0.0
+
+    def expired(self) -> bool:
+        now = perf_counter()
+        self.unit = max(self.unit, now - self.last)
+        self.last = now
+        # No se empieza otra unidad si no cabe en el tiempo que queda
+        return now + self.unit >= self.end
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.end - perf_counter()) * 1000)
+
+
+class LatencyTracker:
+    """
+    Acumula la latencia de cada decisión agrupada por estrategia.
+    """
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        self.samples.setdefault(name, []).append(elapsed_ms)
+
+    def percentile(self, name: str, q: float) -> float:
+        samples = sorted(self.samples.get(name, []))
+        if not samples:
+            return 0.0
+        # Rango más cercano
+        rank = max(1, math.ceil(q / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": len(samples),
+                "p50": self.percentile(name, 50),
+                "p99": self.percentile(name, 99),
+                "max": max(samples),
+            }
+            for name, samples in self.samples.items()
+        }
+
+    def report(self) -> str:
+        from prettytable import PrettyTable
+
+        table = PrettyTable()
+        table.field_names = ["Estrategia", "Decisiones", "P50 (ms)", "P99 (ms)", "Máx (ms)"]
+        for name, stats in sorted(self.summary().items()):
+            table.add_row(
+                [
+                    name,
+                    stats["count"],
+                    f'{stats["p50"]:.1f}',
+                    f'{stats["p99"]:.1f}',
+                    f'{stats["max"]:.1f}',
+                ]
+            )
+        return table.get_string()
@@ -1,5 +1,5 @@
-from random import randint
+from Tools.rng import BlockRandom
 
 
-def coin_toss() -> int:
-    return randint(-1, 1)
+def coin_toss(rng: BlockRandom) -> int:
+    return rng.randint(-1, 1)
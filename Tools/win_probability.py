@@ -0,0 +1,149 @@
+from typing import TYPE_CHECKING, Sequence, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from Tools.game import Game
+
+from Tools.enum import T1
+from Tools.line_up import LineUp
+
+ROTATIONS = 6
+# coin_toss da -1, 0 o 1 y saca T1 con cualquier valor distinto de cero
+FIFTH_SET_T1_SERVE = 2 / 3
+# Iteraciones máximas y tolerancia del empate a partir de 24-24
+DEUCE_ITERATIONS = 1000
+DEUCE_TOLERANCE = 1e-13
+
+
+def rotation(line_up: LineUp) -> int:
+    # Veces que ha rotado el line-up desde el inicio del partido, módulo 6
+    grid = next(iter(line_up.line_up.values()))
+    return (grid.slot - grid.position_number) % ROTATIONS
+
+
+class WinProbabilityTable:
+    """
+    Probabilidad exacta de que T1 gane el partido desde cada estado: sets,
+    puntos (con el empate a partir de 24-24), equipo que saca y rotación de
+    cada equipo. Se calcula por programación dinámica a partir de la
+    probabilidad de que el equipo que saca gane la jugada en cada rotación.
+    """
+
+    def __init__(
+        self,
+        t1_rates: Sequence[float],
+        t2_rates: Sequence[float],
+        points_to_win_set: int = 25,
+        sets_to_win: int = 3,
+    ) -> None:
+        self.t1_rates: np.ndarray = np.broadcast_to(np.asarray(t1_rates, dtype=float), ROTATIONS)
+        self.t2_rates: np.ndarray = np.broadcast_to(np.asarray(t2_rates, dtype=float), ROTATIONS)
+        self.points_to_win_set: int = points_to_win_set
+        self.sets_to_win: int = sets_to_win
+
+        # [sets T1, sets T2, puntos T1, puntos T2, saque (0 T1, 1 T2), rotación T1, rotación T2]
+        points = points_to_win_set + 1
+        self.values: np.ndarray = np.zeros(
+            (sets_to_win, sets_to_win, points, points, 2, ROTATIONS, ROTATIONS)
+        )
+        for played in range(2 * sets_to_win - 2, -1, -1):
+            for t1_sets in range(sets_to_win):
+                t2_sets = played - t1_sets
+                if 0 <= t2_sets < sets_to_win:
+                    self._solve_set(t1_sets, t2_sets)
+
+    def probability(
+        self,
+        t1_sets: int,
+        t2_sets: int,
+        t1_score: int,
+        t2_score: int,
+        serving_team: str,
+        t1_rotation: int = 0,
+        t2_rotation: int = 0,
+    ) -> float:
+        if t1_sets >= self.sets_to_win:
+            return 1.0
+        if t2_sets >= self.sets_to_win:
+            return 0.0
+        t1_score, t2_score = self._deuce(t1_score, t2_score)
+        serve = 0 if serving_team == T1 else 1
+        return float(
+            self.values[t1_sets, t2_sets, t1_score, t2_score, serve, t1_rotation, t2_rotation]
+        )
+
+    def for_game(self, game: "Game") -> float:
+        return self.probability(
+            game.t1_sets,
+            game.t2_sets,
+            game.t1_score,
+            game.t2_score,
+            game.serving_team,
+            rotation(game.t1.line_up),
+            rotation(game.t2.line_up),
+        )
+
+    def _deuce(self, t1_score: int, t2_score: int) -> Tuple[int, int]:
+        # 26-26 vale lo mismo que 24-24, 27-26 lo mismo que 25-24...
+        extra = min(t1_score, t2_score) - (self.points_to_win_set - 1)
+        if extra > 0:
+            return t1_score - extra, t2_score - extra
+        return t1_score, t2_score
+
+    def _set_start(self, t1_sets: int, t2_sets: int) -> np.ndarray:
+        # Valor al empezar el set siguiente, por rotaciones; las rotaciones
+        # se mantienen de un set a otro
+        if t1_sets == self.sets_to_win:
+            return np.ones((ROTATIONS, ROTATIONS))
+        if t2_sets == self.sets_to_win:
+            return np.zeros((ROTATIONS, ROTATIONS))
+
+        start = self.values[t1_sets, t2_sets, 0, 0]
+        next_set = t1_sets + t2_sets + 1
+        if next_set == 2 * self.sets_to_win - 1:
+            return FIFTH_SET_T1_SERVE * start[0] + (1 - FIFTH_SET_T1_SERVE) * start[1]
+        return start[0] if next_set % 2 == 1 else start[1]
+
+    def _rally(self, t1_scores: np.ndarray, t2_scores: np.ndarray) -> np.ndarray:
+        """
+        Valor antes de una jugada a partir del valor tras el punto de cada
+        equipo. Quien gana el saque del rival rota antes de sacar.
+        """
+        q1 = self.t1_rates[:, None]
+        q2 = self.t2_rates[None, :]
+        value = np.empty((2, ROTATIONS, ROTATIONS))
+        value[0] = q1 * t1_scores[0] + (1 - q1) * np.roll(t2_scores[1], -1, axis=1)
+        value[1] = q2 * t2_scores[1] + (1 - q2) * np.roll(t1_scores[0], -1, axis=0)
+        return value
+
+    def _solve_set(self, t1_sets: int, t2_sets: int) -> None:
+        target = self.points_to_win_set
+        values = self.values[t1_sets, t2_sets]
+        t1_wins = np.broadcast_to(self._set_start(t1_sets + 1, t2_sets), (2, ROTATIONS, ROTATIONS))
+        t2_wins = np.broadcast_to(self._set_start(t1_sets, t2_sets + 1), (2, ROTATIONS, ROTATIONS))
+
+        for score in range(target - 1):
+            values[target, score] = t1_wins
+            values[score, target] = t2_wins
+
+        # Empate, ventaja de T1 y ventaja de T2 se alimentan entre sí
+        tie = np.zeros((2, ROTATIONS, ROTATIONS))
+        for _ in range(DEUCE_ITERATIONS):
+            t1_advantage = self._rally(t1_wins, tie)
+            t2_advantage = self._rally(tie, t2_wins)
+            new_tie = self._rally(t1_advantage, t2_advantage)
+            converged = np.abs(new_tie - tie).max() < DEUCE_TOLERANCE
+            tie = new_tie
+            if converged:
+                break
+        values[target - 1, target - 1] = tie
+        values[target, target - 1] = self._rally(t1_wins, tie)
+        values[target - 1, target] = self._rally(tie, t2_wins)
+
+        for total in range(2 * target - 3, -1, -1):
+            for t1_score in range(max(0, total - target + 1), min(total, target - 1) + 1):
+                t2_score = total - t1_score
+                values[t1_score, t2_score] = self._rally(
+                    values[t1_score + 1, t2_score], values[t1_score, t2_score + 1]
+                )
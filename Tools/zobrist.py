@@ -0,0 +1,74 @@
+from typing import Dict, List
+
+import numpy as np
+
+from Tools.enum import COLUMNS, ROWS, T1, T2
+
+ZOBRIST_SEED = 20240917
+
+# Tamaño del dominio de cada característica. Los enteros fuera de rango se
+# pliegan con el módulo; None ocupa la última entrada de su tabla
+MAX_DORSAL = 100
+MAX_POINTS = 64
+MAX_SETS = 8
+MAX_TOUCHES = 16
+TEAM_INDEX = {"": 0, T1: 1, T2: 2, None: 3}
+TEAM_FEATURES = {"team", "last_team_touched", "serving_team", "ball_possession_team"}
+
+# Valores de una casilla vacía, no aportan al hash
+CELL_DEFAULTS = {"player": -1, "team": "", "position": 0, "ball": False}
+CELL_SIZES = {"player": MAX_DORSAL, "team": len(TEAM_INDEX), "position": 7, "ball": 2}
+FEATURE_SIZES = {
+    "t1_score": MAX_POINTS,
+    "t2_score": MAX_POINTS,
+    "t1_sets": MAX_SETS,
+    "t2_sets": MAX_SETS,
+    "t1_touches": MAX_TOUCHES,
+    "t2_touches": MAX_TOUCHES,
+    "general_touches": MAX_TOUCHES,
+    "last_player_touched": MAX_DORSAL + 1,
+    "last_team_touched": len(TEAM_INDEX),
+    "serving_team": len(TEAM_INDEX),
+    "ball_possession_team": len(TEAM_INDEX),
+    "rally_over": 2,
+    "has_ball_landed": 2,
+}
+
+
+def _draw(rng: np.random.Generator, *shape: int) -> List:
+    return rng.integers(0, 1 << 64, size=shape, dtype=np.uint64).tolist()
+
+
+# Las tablas se generan al importar y siempre en el mismo orden, así que las
+# claves son las mismas en todos los procesos
+_rng = np.random.default_rng(ZOBRIST_SEED)
+_cell_keys: Dict[str, List[List[List[int]]]] = {
+    attr: _draw(_rng, ROWS, COLUMNS, size) for attr, size in CELL_SIZES.items()
+}
+_feature_keys: Dict[str, List[int]] = {
+    name: _draw(_rng, size) for name, size in FEATURE_SIZES.items()
+}
+
+
+def value_index(name: str, value, size: int) -> int:
+    if name in TEAM_FEATURES:
+        return TEAM_INDEX[value]
+    if value is None:
+        return size - 1
+    return int(value) % size
+
+
+def zobrist_key(name: str, value) -> int:
+    """
+    Clave aleatoria de 64 bits de una característica del partido con un
+    valor dado.
+    """
+    keys = _feature_keys[name]
+    return keys[value_index(name, value, len(keys))]
+
+
+def cell_key(row: int, col: int, attr: str, value) -> int:
+    if value == CELL_DEFAULTS[attr]:
+        return 0
+    keys = _cell_keys[attr][row][col]
+    return keys[value_index(attr, value, len(keys))]
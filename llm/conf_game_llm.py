@@ -1,18 +1,20 @@
-from typing import Tuple
+from typing import TYPE_CHECKING, Tuple
 
-from pandas import DataFrame
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 from Agents.manager_action_strategy import (ActionRandomStrategy,
                                             ActionSimulateStrategy,
                                             ManagerActionStrategy)
 from Agents.manager_line_up_strategy import (ManagerLineUpStrategy, LineUpStandardStrategy)
-from Agents.player_strategy import (MinimaxStrategy, PlayerStrategy,
+from Agents.player_strategy import (AlphaBetaStrategy, MCTSStrategy,
+                                    MinimaxStrategy, PlayerStrategy,
                                     RandomStrategy, VolleyballStrategy)
 from Simulator.simulation_params import SimulationParams
 from .gemini import query
 
 
-def conf_game_llm(user_prompt: str, df: DataFrame) -> SimulationParams | None:
+def conf_game_llm(user_prompt: str, df: "DataFrame") -> SimulationParams | None:
     try:
         names = teams_prompt(user_prompt, df)
         managers_line_up = managers_line_up_prompt()
@@ -26,7 +28,7 @@ def conf_game_llm(user_prompt: str, df: DataFrame) -> SimulationParams | None:
         return None
 
 
-def teams_prompt(user_prompt: str, df: DataFrame) -> Tuple[str, str]:
+def teams_prompt(user_prompt: str, df: "DataFrame") -> Tuple[str, str]:
     team_names = df["Team"].unique().tolist()
     team_names = [i for i in team_names if isinstance(i, str)]
     prompt = f"""
@@ -85,6 +87,8 @@ def players_action_prompt(user_prompt: str) -> Tuple[PlayerStrategy, PlayerStrat
         "random": RandomStrategy(),
         "heuristic": VolleyballStrategy(),
         "minimax": MinimaxStrategy(),
+        "alphabeta": AlphaBetaStrategy(),
+        "mcts": MCTSStrategy(),
     }
     prompt = f"""
         Dada la siguiente lista de estrategias: {strategies.keys()}
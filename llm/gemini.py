@@ -1,15 +1,21 @@
 import os
 
-import google.generativeai as genai
-from dotenv import load_dotenv
+# El cliente de Gemini se configura en la primera consulta, no al importar
+_model = None
 
-load_dotenv()
 
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=gemini_api_key)
-model = genai.GenerativeModel("gemini-pro")
+def _get_model():
+    global _model
+    if _model is None:
+        import google.generativeai as genai
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        _model = genai.GenerativeModel("gemini-pro")
+    return _model
 
 
 def query(prompt: str) -> str:
-    response = model.generate_content(prompt)
+    response = _get_model().generate_content(prompt)
     return response.text
@@ -6,6 +6,9 @@ import pandas as pd
 from Simulator.build_data import conf_game
 from starting_params import all_random
 
+# Tiempo máximo por decisión de cada agente durante la reproducción en vivo
+DECISION_MS = 200
+
 df = pd.read_csv("data/VNL2024Men.csv")
 # df.loc[:, df.columns.str.startswith("p_")] = 50
 df["Dorsal"] = range(1, len(df) + 1)
@@ -29,7 +32,7 @@ if params is None:
     print("No se pudo inferir los parámetros de la simulación")
     exit()
 
-sim = conf_game(params, df)
+sim = conf_game(params, df, DECISION_MS)
 
 
 def clear_console():
@@ -46,3 +49,7 @@ for s in sim.simulate():
     clear_console()
     print(s)
 print(time() - current_time)
+print(sim.latency.report())
+search_report = sim.search_report()
+if search_report:
+    print(search_report)
@@ -1,7 +1,9 @@
 from Agents.manager_action_strategy import (ActionRandomStrategy,
                                             ActionSimulateStrategy)
 from Agents.manager_line_up_strategy import LineUpStandardStrategy
-from Agents.player_strategy import MinimaxStrategy, VolleyballStrategy, RandomStrategy
+from Agents.player_strategy import (AlphaBetaStrategy, MCTSStrategy,
+                                    MinimaxStrategy, RandomStrategy,
+                                    VolleyballStrategy)
 from Simulator.simulation_params import SimulationParams
 
 
@@ -102,3 +104,23 @@ minimax_vs_minimax_player = StartingParams(
     ),
     "minimax_vs_minimax_player",
 )
+
+alphabeta_vs_random_player = StartingParams(
+    SimulationParams(
+        team_names,
+        (LineUpStandardStrategy(), LineUpStandardStrategy()),
+        (ActionRandomStrategy(), ActionRandomStrategy()),
+        (AlphaBetaStrategy(), RandomStrategy()),
+    ),
+    "alphabeta_vs_random_player",
+)
+
+mcts_vs_random_player = StartingParams(
+    SimulationParams(
+        team_names,
+        (LineUpStandardStrategy(), LineUpStandardStrategy()),
+        (ActionRandomStrategy(), ActionRandomStrategy()),
+        (MCTSStrategy(), RandomStrategy()),
+    ),
+    "mcts_vs_random_player",
+)
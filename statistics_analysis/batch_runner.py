@@ -0,0 +1,191 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import multiprocessing as mp
+import time
+from collections import Counter
+from statistics import mean, stdev
+from typing import Dict, List, Tuple
+
+import starting_params
+from Simulator.build_data import conf_game
+from Simulator.simulator import AGENTS, ENGINES
+
+# Cuantil de la normal para intervalos de confianza del 95 %
+Z_95 = 1.96
+
+MatchTask = Tuple[str, int, int, str]
+
+# Plantillas cargadas una sola vez por proceso
+_df = None
+
+
+def _init_worker(csv_path: str) -> None:
+    global _df
+    import pandas as pd
+
+    _df = pd.read_csv(csv_path)
+    _df["Dorsal"] = range(1, len(_df) + 1)
+
+
+def _play(task: MatchTask) -> Tuple[int, dict]:
+    name, index, seed, engine = task
+    params = getattr(starting_params, name)
+
+    sim = conf_game(params.simulation_params, _df, seed=seed, engine=engine)
+    # Los mensajes del partido no interesan en una tanda
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = sim.simulate_and_save()
+    data["t1_sets"] = sim.game.t1_sets
+    data["t2_sets"] = sim.game.t2_sets
+    data["names"] = [sim.t1.name, sim.t2.name]
+    return index, data
+
+
+def mean_interval(values: List[float]) -> Tuple[float, float]:
+    # Media y semiamplitud del intervalo de confianza del 95 %
+    if len(values) < 2:
+        return (mean(values) if values else 0.0), 0.0
+    return mean(values), Z_95 * stdev(values) / math.sqrt(len(values))
+
+
+def wilson_interval(successes: int, n: int) -> Tuple[float, float]:
+    # Intervalo de Wilson del 95 % para una proporción
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + Z_95 ** 2 / n
+    center = (p + Z_95 ** 2 / (2 * n)) / denominator
+    half = Z_95 * math.sqrt(p * (1 - p) / n + Z_95 ** 2 / (4 * n ** 2)) / denominator
+    return center - half, center + half
+
+
+class BatchResult:
+    """
+    Resultados de N partidos de una misma configuración: victorias, sets
+    y medias por jugador con su intervalo de confianza del 95 %.
+    """
+
+    def __init__(self, name: str, matches: List[dict], elapsed: float) -> None:
+        self.name: str = name
+        self.matches: List[dict] = matches
+        self.elapsed: float = elapsed
+        self.names: List[str] = matches[0]["names"] if matches else ["T1", "T2"]
+
+    @property
+    def throughput(self) -> float:
+        return len(self.matches) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def wins(self) -> int:
+        return sum(1 for m in self.matches if m["t1_sets"] > m["t2_sets"])
+
+    def win_rate(self) -> Tuple[float, float, float]:
+        wins, n = self.wins(), len(self.matches)
+        low, high = wilson_interval(wins, n)
+        return (wins / n if n else 0.0), low, high
+
+    def set_distribution(self) -> Dict[str, float]:
+        counts = Counter(f"{m['t1_sets']}-{m['t2_sets']}" for m in self.matches)
+        return {score: counts[score] / len(self.matches) for score in sorted(counts)}
+
+    def player_means(self) -> Dict[Tuple[str, str, str], Tuple[float, float]]:
+        # (equipo, dorsal, estadística) -> (media, semiamplitud)
+        values: Dict[Tuple[str, str, str], List[float]] = {}
+        for m in self.matches:
+            for team, name in zip(("t1", "t2"), m["names"]):
+                for dorsal, stats in m[team]["players_statistics"].items():
+                    for stat, value in stats.items():
+                        values.setdefault((name, str(dorsal), stat), []).append(value)
+        return {key: mean_interval(v) for key, v in values.items()}
+
+    def to_json(self) -> dict:
+        rate, low, high = self.win_rate()
+        return {
+            "name": self.name,
+            "matches": len(self.matches),
+            "seconds": self.elapsed,
+            "matches_per_second": self.throughput,
+            "win_rate": {"t1": rate, "low": low, "high": high},
+            "sets": self.set_distribution(),
+            "players": {
+                f"{team}-{dorsal}-{stat}": {"mean": value, "ci": half}
+                for (team, dorsal, stat), (value, half) in self.player_means().items()
+            },
+        }
+
+    def report(self, stats: Tuple[str, ...] = ("points", "errors", "attacks")) -> str:
+        from prettytable import PrettyTable
+
+        rate, low, high = self.win_rate()
+        sets = ", ".join(f"{s}: {p:.0%}" for s, p in self.set_distribution().items())
+        lines = [
+            f"{self.name}: {len(self.matches)} partidos en {self.elapsed:.1f} s "
+            f"({self.throughput:.2f} partidos/s)",
+            f"Victorias {self.names[0]}: {rate:.1%} [{low:.1%}, {high:.1%}]",
+            f"Sets: {sets}",
+        ]
+
+        table = PrettyTable()
+        table.field_names = ["Equipo", "Dorsal"] + [s.capitalize() for s in stats]
+        means = self.player_means()
+        players = sorted({(team, dorsal) for team, dorsal, _ in means}, key=lambda p: (p[0], int(p[1])))
+        for team, dorsal in players:
+            row = [team, dorsal]
+            for stat in stats:
+                value, half = means.get((team, dorsal, stat), (0.0, 0.0))
+                row.append(f"{value:.2f} ± {half:.2f}")
+            table.add_row(row)
+        lines.append(table.get_string())
+        return "\n".join(lines)
+
+
+class BatchRunner:
+    """
+    Juega N partidos por configuración repartidos entre un pool de procesos.
+    Cada partido usa su propia semilla, así que el resultado no depende del
+    número de procesos.
+    """
+
+    def __init__(self, csv_path: str, workers: int = 0, engine: str = AGENTS) -> None:
+        self.csv_path: str = csv_path
+        self.workers: int = workers if workers > 0 else mp.cpu_count()
+        self.engine: str = engine
+
+    def run(self, names: List[str], matches: int, seed: int = 0) -> List[BatchResult]:
+        method = "fork" if "fork" in mp.get_all_start_methods() else "spawn"
+        with mp.get_context(method).Pool(
+            self.workers, initializer=_init_worker, initargs=(self.csv_path,)
+        ) as pool:
+            return [self.run_one(pool, name, matches, seed) for name in names]
+
+    def run_one(self, pool, name: str, matches: int, seed: int) -> BatchResult:
+        if not isinstance(getattr(starting_params, name, None), starting_params.StartingParams):
+            raise Exception(f"No existe la configuración {name}")
+
+        tasks = [(name, i, seed + i, self.engine) for i in range(matches)]
+        start = time.perf_counter()
+        results = dict(pool.imap_unordered(_play, tasks))
+        elapsed = time.perf_counter() - start
+        return BatchResult(name, [results[i] for i in range(matches)], elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tanda de partidos por configuración")
+    parser.add_argument("params", nargs="+", help="nombres de starting_params")
+    parser.add_argument("-n", "--matches", type=int, default=10)
+    parser.add_argument("-w", "--workers", type=int, default=0)
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    parser.add_argument("-e", "--engine", choices=ENGINES, default=AGENTS)
+    parser.add_argument("--csv", default="./data/VNL2024Men.csv")
+    parser.add_argument("--save", help="fichero JSON para los resultados agregados")
+    args = parser.parse_args()
+
+    batch = BatchRunner(args.csv, args.workers, args.engine).run(args.params, args.matches, args.seed)
+    for result in batch:
+        print(result.report())
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump([result.to_json() for result in batch], file)
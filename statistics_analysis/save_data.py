@@ -26,7 +26,9 @@ params = [
     smart_player,
     smart_vs_random_player,
     minimax_vs_random_player,
-    minimax_vs_minimax_player
+    minimax_vs_minimax_player,
+    alphabeta_vs_random_player,
+    mcts_vs_random_player
 ]
 
 initial_time = time.time()
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import random
+
+import pandas as pd
+import pytest
+
+import starting_params
+from Simulator.build_data import conf_game
+from Simulator.simulator import Simulator
+
+SKILLS = ("p_Attack", "p_Block", "p_Dig", "p_Set", "p_Serve", "p_Receive")
+ROSTER = (("S", 2), ("OH", 4), ("O", 2), ("MB", 3), ("L", 2))
+
+
+def make_df(seed: int = 0) -> pd.DataFrame:
+    # Dos plantillas inventadas con todos los roles y suplentes en cada uno
+    rnd = random.Random(seed)
+    rows = []
+    for team in ("USA", "JPN"):
+        for position, count in ROSTER:
+            for i in range(count):
+                row = {"Name": f"{team}-{position}{i}", "Team": team, "Position": position}
+                row.update({skill: rnd.randint(60, 95) for skill in SKILLS})
+                rows.append(row)
+    df = pd.DataFrame(rows)
+    df["Dorsal"] = range(1, len(df) + 1)
+    return df
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return make_df()
+
+
+@pytest.fixture
+def simulator(df) -> Simulator:
+    sim = conf_game(starting_params.all_random.simulation_params, df, seed=3)
+    simulator = Simulator(sim.t1, sim.t2, sim.game)
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulator.start_match()
+    return simulator
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from Agents.fuzzy_rules import (DefensivePositionFuzzySystem,
+                                OffensivePositionFuzzySystem, get_role_number)
+from Tools.field import COLUMNS, ROWS, distance_tables
+
+ROLES = ("L", "S", "MB", "OH", "O")
+SAMPLES = 6
+# Entre nodos la tabla interpola: error máximo admitido en la escala 0-100
+TOLERANCE = 0.1
+
+pytestmark = pytest.mark.slow
+
+
+@pytest.fixture(scope="module")
+def systems():
+    # Construir las tablas cuesta unos segundos, se comparten en el módulo
+    return [
+        (DefensivePositionFuzzySystem(), False),
+        (OffensivePositionFuzzySystem(), True),
+    ]
+
+
+def arguments(distance_to_position, distance_to_ball, role, offensive: bool) -> tuple:
+    if offensive:
+        return distance_to_position, 0, distance_to_ball, role
+    return distance_to_position, distance_to_ball, role
+
+
+def test_table_matches_skfuzzy_on_cell_distances(systems):
+    rng = np.random.default_rng(0)
+    cells = np.unique(distance_tables(ROWS, COLUMNS).euclidean)
+    for system, offensive in systems:
+        high = system.distance_to_position.universe.max()
+        nodes = cells[cells <= high]
+        for role in ROLES:
+            for position, ball in rng.choice(nodes, (SAMPLES, 2)):
+                args = arguments(position, ball, role, offensive)
+                assert system.evaluate(*args) == pytest.approx(system.reference(*args), abs=1e-9)
+
+
+def test_table_close_to_skfuzzy_between_nodes(systems):
+    rng = np.random.default_rng(1)
+    for system, offensive in systems:
+        high = system.distance_to_position.universe.max()
+        for role in ROLES:
+            for position, ball in rng.uniform(0, high, (SAMPLES, 2)):
+                args = arguments(position, ball, role, offensive)
+                assert abs(system.evaluate(*args) - system.reference(*args)) <= TOLERANCE
+
+
+def test_batch_matches_single_evaluation(systems):
+    rng = np.random.default_rng(2)
+    for system, offensive in systems:
+        high = system.distance_to_position.universe.max()
+        positions, balls = rng.uniform(0, high, (2, 50))
+        roles = rng.choice(ROLES, 50)
+        numbers = np.array([get_role_number(role) for role in roles])
+        expected = [
+            system.evaluate(*arguments(p, b, r, offensive))
+            for p, b, r in zip(positions, balls, roles)
+        ]
+        assert system.evaluate_many(positions, balls, numbers) == pytest.approx(expected)
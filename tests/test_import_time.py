@@ -0,0 +1,9 @@
+from Tools.import_time import ENTRY_MODULES, LAZY_MODULES, loaded_modules
+
+
+def test_entry_modules_do_not_load_lazy_packages():
+    # Los tiempos dependen de la carga de la máquina: se comprueban con
+    # `python -m Tools.import_time --check`, no aquí
+    for module in ENTRY_MODULES:
+        loaded = loaded_modules(module)
+        assert [lazy for lazy in LAZY_MODULES if lazy in loaded] == [], module
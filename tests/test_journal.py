@@ -0,0 +1,108 @@
+from Agents.actions import Checkpoint, Move, RestoreLineupAction, Substitution
+from Agents.manager_action_strategy import possible_substitutions
+from Tools.enum import T1
+from Tools.packed_state import pack
+
+
+def field_state(game) -> tuple:
+    field = game.field
+    return (
+        [(g.ball, g.player, g.team, g.position) for g in field.cells],
+        field.hash,
+        game.hash(),
+        set(field.ball_cells),
+        {key: set(cells) for key, cells in field.player_cells.items() if cells},
+        {key: set(cells) for key, cells in field.position_cells.items() if cells},
+        [layer.tolist() for layer in (field.teams, field.players, field.positions, field.balls)],
+        # El estado empaquetado incluye marcador, toques y estadísticas
+        pack(game).tolist(),
+    )
+
+
+def moves(game, count: int):
+    # Cada jugador en cancha se mueve a la primera casilla vacía contigua de su lado
+    field = game.field
+    result = []
+    for (player, team), cells in sorted(field.player_cells.items()):
+        if not cells or len(result) == count:
+            continue
+        src = min(cells)
+        dests = field.empty_ring(src, team, 0, 1.5)
+        if len(dests):
+            dest = divmod(int(dests[0]), field.columns)
+            result.append(Move(divmod(src, field.columns), dest, player, team, game))
+    return result
+
+
+def test_undo_to_mark_restores_moves(simulator):
+    game = simulator.game
+    dispatch = simulator.dispatch
+    before = field_state(game)
+    mark = game.journal.mark()
+
+    for action in moves(game, 4):
+        dispatch.dispatch(action)
+    assert field_state(game) != before
+
+    game.journal.undo(mark)
+    assert field_state(game) == before
+
+
+def test_rollback_restores_a_simulated_rally(simulator):
+    game = simulator.game
+    dispatch = simulator.dispatch
+    before = field_state(game)
+    stack_len = len(dispatch.stack)
+    mark = game.journal.mark()
+
+    simulator.simulate_rally(set())
+    assert field_state(game) != before
+
+    # Las acciones revierten lo que no pasa por el journal; el inicio del
+    # rally se registra antes de la primera acción y lo deshace la marca
+    while len(dispatch.stack) != stack_len:
+        dispatch.rollback()
+    game.journal.undo(mark)
+    assert field_state(game) == before
+
+
+def test_checkpoint_only_compacts_outside_simulations(simulator):
+    dispatch = simulator.dispatch
+    journal = simulator.game.journal
+    simulator.simulate_rally(set())
+    stack = list(dispatch.stack)
+    mark = journal.mark()
+    assert mark > 0
+
+    # Una simulación anidada todavía puede deshacer la jugada
+    simulator.depth = 1
+    simulator.checkpoint()
+    assert dispatch.stack == stack
+    assert journal.mark() == mark
+
+    simulator.depth = 0
+    simulator.checkpoint()
+    assert len(dispatch.stack) == 1 and isinstance(dispatch.stack[0], Checkpoint)
+    assert journal.mark() == 0
+    assert simulator.stack == []
+
+
+def test_cancelled_substitution_changes_the_journal_version(simulator):
+    game = simulator.game
+    dispatch = simulator.dispatch
+    substitution = next(
+        a for a in possible_substitutions(game, T1) if isinstance(a, Substitution)
+    )
+    # El jugador que sale ya no está disponible: solo cambia el line-up
+    game.t1.unavailable.add(substitution.player_out)
+    dispatch.dispatch(substitution)
+    version = game.journal.version()
+
+    dispatch.dispatch(RestoreLineupAction(-1, T1, game))
+    assert substitution.not_execute
+    assert game.journal.version() != version
+
+    version = game.journal.version()
+    dispatch.rollback()
+    dispatch.rollback()
+    assert game.journal.version() != version
@@ -0,0 +1,49 @@
+import contextlib
+import io
+import math
+
+import numpy as np
+import pytest
+
+import starting_params
+from conftest import SKILLS, make_df
+from Simulator.build_data import conf_game, simulate_many
+from Simulator.lockstep import LockstepSimulator
+from Simulator.markov import win_table
+from Simulator.simulator import MARKOV
+from Tools.enum import T1, T2
+from Tools.win_probability import FIFTH_SET_T1_SERVE
+
+PARAMS = starting_params.all_random.simulation_params
+MATCHES = 2000
+
+
+def test_same_seed_same_results(df):
+    first = simulate_many(PARAMS, df, 50, seed=5)
+    second = simulate_many(PARAMS, df, 50, seed=5)
+    assert np.array_equal(first.sets, second.sets)
+    assert np.array_equal(first.stats, second.stats)
+
+
+def test_stronger_team_wins_more():
+    df = make_df()
+    weaker = df["Team"] == "JPN"
+    df.loc[weaker, list(SKILLS)] -= 10
+    result = simulate_many(PARAMS, df, 200, seed=1)
+    assert result.names[0] == "USA"
+    assert result.win_rate() > 0.5
+
+
+def test_win_rate_matches_the_win_probability_table(df):
+    sim = conf_game(PARAMS, df, seed=3, engine=MARKOV)
+    with contextlib.redirect_stdout(io.StringIO()):
+        lockstep = LockstepSimulator(sim.t1, sim.t2, sim.game)
+    result = lockstep.run(MATCHES, seed=3)
+
+    # Mismo line-up en todos los partidos; el primer saque se sortea como en coin_toss
+    table = win_table(sim.game)
+    expected = FIFTH_SET_T1_SERVE * table.probability(0, 0, 0, 0, T1) + (
+        1 - FIFTH_SET_T1_SERVE
+    ) * table.probability(0, 0, 0, 0, T2)
+    tolerance = 4 * math.sqrt(expected * (1 - expected) / MATCHES)
+    assert result.win_rate() == pytest.approx(expected, abs=tolerance)
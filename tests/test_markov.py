@@ -0,0 +1,59 @@
+import contextlib
+import io
+import math
+
+import pytest
+
+import starting_params
+from conftest import SKILLS, make_df
+from Simulator.build_data import conf_game
+from Simulator.markov import win_table
+from Simulator.simulator import MARKOV
+
+MATCHES = 300
+
+
+def play(df, seed: int):
+    # Partido completo con el motor de Markov y la probabilidad de la tabla al empezar
+    sim = conf_game(starting_params.all_random.simulation_params, df, seed=seed, engine=MARKOV)
+    simulator = sim.simulator()
+    with contextlib.redirect_stdout(io.StringIO()):
+        simulator.start_match()
+        probability = win_table(sim.game).for_game(sim.game)
+        while not sim.game.is_finish():
+            simulator.simulate_rally()
+    return sim, probability
+
+
+def test_same_seed_same_match(df):
+    first, _ = play(df, 7)
+    second, _ = play(df, 7)
+    assert first.game.to_json() == second.game.to_json()
+    assert first.game.points_history == second.game.points_history
+
+
+def test_stronger_team_wins_more():
+    df = make_df()
+    weaker = df["Team"] == "JPN"
+    df.loc[weaker, list(SKILLS)] -= 10
+    wins = 0
+    for seed in range(50):
+        sim, _ = play(df, seed)
+        assert sim.t1.name == "USA"
+        wins += sim.game.t1_sets > sim.game.t2_sets
+    assert wins / 50 > 0.5
+
+
+def test_win_rate_matches_the_win_probability_table(df):
+    wins = 0
+    probabilities = []
+    for seed in range(MATCHES):
+        sim, probability = play(df, seed)
+        wins += sim.game.t1_sets > sim.game.t2_sets
+        probabilities.append(probability)
+
+    # La tabla es exacta para la cadena de toques del motor: la frecuencia
+    # observada cae a menos de cuatro errores típicos de la media esperada
+    expected = sum(probabilities) / MATCHES
+    tolerance = 4 * math.sqrt(expected * (1 - expected) / MATCHES)
+    assert wins / MATCHES == pytest.approx(expected, abs=tolerance)
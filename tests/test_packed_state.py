@@ -0,0 +1,76 @@
+from Agents.actions import RestoreLineupAction, Substitution
+from Agents.manager_action_strategy import possible_substitutions
+from Tools.enum import T1
+from Tools.packed_state import pack, unpack
+
+
+def team_state(game) -> list:
+    state = []
+    for team in (game.t1, game.t2):
+        state.append(
+            (
+                sorted(team.on_field),
+                sorted(team.on_bench),
+                sorted(team.unavailable),
+                list(team.substitution_history),
+                [(n, grid.player) for n, grid in team.line_up.line_up.items()],
+            )
+        )
+    state.append([(grid.player, grid.team) for row in game.field.grid for grid in row])
+    return state
+
+
+def substitution(game) -> Substitution:
+    return next(a for a in possible_substitutions(game, T1) if isinstance(a, Substitution))
+
+
+def test_round_trip_with_substitution(simulator):
+    game = simulator.game
+    before = team_state(game)
+    state = pack(game)
+
+    # El cambio se aplica al comprimir la pila de cambios pendientes
+    simulator.dispatch.dispatch(substitution(game))
+    simulator.dispatch.dispatch(RestoreLineupAction(-1, T1, game))
+    assert team_state(game) != before
+
+    unpack(game, state)
+    assert team_state(game) == before
+    assert pack(game) == state
+
+
+def test_restore_brings_back_pending_substitutions(simulator):
+    dispatch = simulator.dispatch
+    game = simulator.game
+    pending = substitution(game)
+    dispatch.dispatch(pending)
+
+    snapshot = dispatch.snapshot()
+    before = team_state(game)
+
+    dispatch.dispatch(RestoreLineupAction(-1, T1, game))
+    assert dispatch.lazy_stack == []
+
+    dispatch.restore(snapshot)
+    assert dispatch.lazy_stack == [pending]
+    assert team_state(game) == before
+
+
+def test_history_unpacked_after_removal_from_the_middle(simulator):
+    dispatch = simulator.dispatch
+    game = simulator.game
+    first = substitution(game)
+    dispatch.dispatch(first)
+    state = pack(game)
+
+    second = next(
+        a for a in possible_substitutions(game, T1)
+        if isinstance(a, Substitution) and a.player_out != first.player_out
+    )
+    dispatch.dispatch(second)
+    # Deshacer el primero borra del medio y deja la misma longitud
+    first.rollback()
+    assert len(game.t1.substitution_history) == 1
+
+    unpack(game, state)
+    assert game.t1.substitution_history == [(first.player_out, first.player_in)]
@@ -0,0 +1,73 @@
+from Agents.actions import Nothing, Substitution
+from Agents.manager_action_strategy import possible_substitutions
+from Agents.player_strategy import MinimaxStrategy
+from Simulator import rollout_pool
+from Simulator.rollout_pool import RolloutPool, roster
+from Tools.enum import T1
+from Tools.timing import Deadline
+
+
+def worker_roster():
+    return roster(rollout_pool._worker[0])
+
+
+def test_workers_restart_after_a_substitution(simulator):
+    game = simulator.game
+    pool = RolloutPool(simulator, 1)
+    try:
+        action = Nothing(next(iter(game.t1.on_field)), T1, game)
+        pool.rollouts(game, [action], set(), 1)
+        assert pool.pool.apply(worker_roster) == roster(simulator)
+
+        # El cambio queda pendiente en la pila perezosa, fuera de `pack`
+        simulator.dispatch.dispatch(
+            next(a for a in possible_substitutions(game, T1) if isinstance(a, Substitution))
+        )
+        assert roster(simulator) != pool.roster
+
+        pool.rollouts(game, [action], set(), 1)
+        assert pool.roster == roster(simulator)
+        assert pool.pool.apply(worker_roster) == roster(simulator)
+    finally:
+        pool.close()
+
+
+def test_rollouts_stop_at_the_deadline(simulator):
+    game = simulator.game
+    pool = RolloutPool(simulator, 1)
+    try:
+        actions = [Nothing(dorsal, T1, game) for dorsal in sorted(game.t1.on_field)[:2]]
+        assert [len(v) for v in pool.rollouts(game, actions, set(), 2)] == [2, 2]
+        # Sin tiempo restante las tareas vuelven sin simular
+        assert pool.rollouts(game, actions, set(), 2, Deadline(0)) == [[], []]
+    finally:
+        pool.close()
+
+
+def test_minimax_uses_the_pool_with_a_deadline(simulator, monkeypatch):
+    game = simulator.game
+    calls = []
+    parallel_rollouts = simulator.parallel_rollouts
+
+    def spy(actions, mask, rollouts, deadline=None):
+        calls.append(deadline)
+        return parallel_rollouts(actions, mask, rollouts, deadline)
+
+    monkeypatch.setattr(simulator, "parallel_rollouts", spy)
+    simulator.workers = 1
+    simulator.depth = 1
+    dorsal, player = next(
+        (dorsal, player) for dorsal, player in sorted(simulator.team1.players.items())
+        if dorsal in game.t1.on_field and len(player.possible_actions(game)) > 1
+    )
+    try:
+        before = game.hash()
+        deadline = Deadline(1000)
+        action = MinimaxStrategy().select_action(
+            player.possible_actions, simulator.get_player_simulator(T1, dorsal, set()), deadline
+        )
+        assert calls == [deadline]
+        assert action is not None
+        assert game.hash() == before
+    finally:
+        simulator.close()
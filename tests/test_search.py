@@ -0,0 +1,76 @@
+from Agents.player_strategy import AlphaBetaStrategy, MinimaxStrategy
+from Agents.simulator_agent import SimulatorAgent
+from Tools.enum import T1
+
+
+class StaticRollouts(SimulatorAgent):
+    """
+    Simulaciones que no juegan: cada acción vale la evaluación del estado al
+    que lleva, así que las dos búsquedas recorren el mismo árbol determinista.
+    """
+
+    def __init__(self, simulator) -> None:
+        super().__init__(simulator.game)
+        self.simulator = simulator
+
+    def simulate(self):
+        pass
+
+    def reset(self):
+        pass
+
+    def simulate_current(self):
+        pass
+
+    def reset_current(self):
+        # La búsqueda vuelve a despachar la acción de la raíz tras cada simulación
+        self.simulator.dispatch.rollback()
+
+    def dispatch(self):
+        return self.simulator.dispatch
+
+
+def describe(action) -> tuple:
+    return action.__class__.__name__, action.src, action.dest, action.player, action.team
+
+
+def value(evaluator, simulator, action) -> float:
+    simulator.dispatch.dispatch(action)
+    result = evaluator.eval(simulator.game, action.team)
+    simulator.dispatch.rollback()
+    return result
+
+
+def test_alpha_beta_picks_the_minimax_action(simulator):
+    game = simulator.game
+    agent = StaticRollouts(simulator)
+    players = [
+        player for dorsal, player in sorted(simulator.team1.players.items())
+        if dorsal in game.t1.on_field
+    ]
+    assert players and all(player.team == T1 for player in players)
+
+    unique = 0
+    for player in players:
+        actions = player.possible_actions(game)
+        # Sin poda por anchura ni presupuesto alfa-beta es minimax exacto
+        alpha_beta = AlphaBetaStrategy(
+            max_depth=1, rollouts=1, width=len(actions), budget=float(len(actions))
+        )
+        minimax = MinimaxStrategy()
+
+        before = game.hash()
+        expected = minimax.select_action(player.possible_actions, agent)
+        assert game.hash() == before
+        chosen = alpha_beta.select_action(player.possible_actions, agent)
+        assert game.hash() == before
+
+        values = [value(minimax.evaluator, simulator, action) for action in actions]
+        best = max(values)
+        assert value(minimax.evaluator, simulator, chosen) == best
+        assert value(minimax.evaluator, simulator, expected) == best
+        # Con empates cada búsqueda puede quedarse con una acción distinta
+        if values.count(best) == 1:
+            unique += 1
+            assert describe(chosen) == describe(expected)
+    assert unique > 0
@@ -0,0 +1,21 @@
+from Agents.transposition_table import EXACT, LOWER, UPPER, TranspositionTable
+
+
+def test_bounds_only_used_when_they_decide_the_window():
+    table = TranspositionTable()
+    table.store("lower", 5.0, 2, flag=LOWER)
+    table.store("upper", 5.0, 2, flag=UPPER)
+    table.store("exact", 5.0, 2, flag=EXACT)
+
+    # Cota inferior: solo corta si ya alcanza beta
+    assert table.probe("lower", 2, 0.0, 10.0) is None
+    assert table.probe("lower", 2, 0.0, 5.0) is not None
+    # Cota superior: solo corta si no supera alfa
+    assert table.probe("upper", 2, 0.0, 10.0) is None
+    assert table.probe("upper", 2, 5.0, 10.0) is not None
+    # Sin ventana solo valen los valores exactos
+    assert table.probe("lower", 2) is None
+    assert table.probe("upper", 2) is None
+    assert table.probe("exact", 2).value == 5.0
+    # Más profundidad de la guardada no vale nunca
+    assert table.probe("exact", 3) is None
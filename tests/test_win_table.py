@@ -0,0 +1,36 @@
+import numpy as np
+
+from Agents.actions import RestoreLineupAction, Substitution
+from Agents.manager_action_strategy import possible_substitutions
+from Simulator.markov import WIN_TABLE_CACHE, cached_win_table, serve_win_rates
+from Tools.enum import T1
+
+
+def test_win_table_follows_substitutions(simulator):
+    game = simulator.game
+    dispatch = simulator.dispatch
+    before = game.win_table
+    snapshot = dispatch.snapshot()
+
+    dispatch.dispatch(
+        next(a for a in possible_substitutions(game, T1) if isinstance(a, Substitution))
+    )
+    dispatch.dispatch(RestoreLineupAction(-1, T1, game))
+
+    after = game.win_table
+    assert after is not before
+    t1_rates, t2_rates = serve_win_rates(game.t1, game.t2)
+    assert np.array_equal(after.t1_rates, t1_rates)
+    assert np.array_equal(after.t2_rates, t2_rates)
+
+    # Deshacer el cambio vuelve a la tabla de antes sin calcularla otra vez
+    dispatch.restore(snapshot)
+    assert game.win_table is before
+
+
+def test_win_table_cache_is_bounded():
+    cached_win_table.cache_clear()
+    for i in range(WIN_TABLE_CACHE + 2):
+        rate = 0.5 + i / 100
+        cached_win_table((rate,) * 6, (0.5,) * 6, 5, 2)
+    assert cached_win_table.cache_info().currsize == WIN_TABLE_CACHE
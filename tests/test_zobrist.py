@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from Tools.zobrist import cell_key, zobrist_key
+
+PROBE = (
+    "from Tools.zobrist import cell_key, zobrist_key;"
+    "print(cell_key(18, 8, 'player', 7), zobrist_key('t1_score', 3))"
+)
+
+
+def test_keys_are_the_same_in_every_process():
+    # Un proceso nuevo, con otra semilla de `hash`, genera las mismas claves
+    env = dict(os.environ, PYTHONHASHSEED="12345")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True
+    )
+    expected = [cell_key(18, 8, "player", 7), zobrist_key("t1_score", 3)]
+    assert result.stdout.split() == [str(key) for key in expected]
+
+
+def test_empty_cells_do_not_change_the_hash():
+    assert cell_key(0, 0, "player", -1) == 0
+    assert cell_key(0, 0, "ball", False) == 0
+    assert zobrist_key("last_player_touched", None) != zobrist_key("last_player_touched", 3)
+    assert zobrist_key("serving_team", None) != zobrist_key("serving_team", "T2")
+
+
+def test_rally_flags_change_the_hash(simulator):
+    game = simulator.game
+    journal = game.journal
+    mark = journal.mark()
+    before = game.hash()
+
+    # Mismo campo y marcador: solo cambia si el rally terminó o la pelota cayó
+    journal.set(game, "rally_over", not game.rally_over)
+    assert game.hash() != before
+    journal.undo(mark)
+
+    journal.set(game, "has_ball_landed", not game.has_ball_landed)
+    assert game.hash() != before
+    journal.undo(mark)
+    assert game.hash() == before